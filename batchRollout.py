@@ -0,0 +1,224 @@
+"""
+Vectorised rollout engine, plays a whole batch of random chess games in lockstep as a NumPy array of boards, so the rollouts of run_sim cost a few NumPy calls per ply instead of python method calls per move
+"""
+
+import random
+import numpy as np
+import chessClass as chessgame
+
+# number of games played together in one array, bigger batches are split into chunks of this size to bound memory use
+BATCH_SIZE = 1024
+# every board array carries a 65th square that is always empty, the lookup tables point off board moves and unused path steps at it
+OFF = 64
+# number of times an illegal sampled move is resampled before all legal moves of the board are listed instead
+RETRIES = 3
+
+# Ordered list of move slots, every square can have one move per slot. A slot is a ray step (direction, steps), a knight jump, a pawn push or a pawn capture. The ray slots come first, seven steps for each of the eight directions in turn
+RAY_SLOTS = 56
+SLOTS = ([("ray", direc, steps) for direc in chessgame.STRAIGHT_VECTORS + chessgame.DIAGONAL_VECTORS for steps in range(1, 8)]
+         + [("knight", direc, 1) for direc in chessgame.KNIGHT_VECTORS]
+         + [("push", (1, 0), 1), ("push", (2, 0), 1), ("capture", (1, 1), 1), ("capture", (1, -1), 1)])
+
+# material value of each signed piece code, indexed by code + KING
+VALUES = np.array([-chessgame.PIECE_VALUES[rank] for rank in range(chessgame.KING, 0, -1)]
+                  + [0] + [chessgame.PIECE_VALUES[rank] for rank in range(1, chessgame.KING + 1)])
+
+
+def build_tables(team):
+    """
+    Given the team to move, build the move slot tables for every square, returns a tuple of
+        targets, (64, slots) array of the target square of each slot, or OFF if it leaves the board
+        movers, (7, slots) bool array of which piece ranks can move along each slot
+        attackers, (7, slots) bool array of which enemy ranks on a slot target attack the square, a pawn push never attacks
+        pushes, (slots,) bool array of the slots that need an empty target
+        captures, (slots,) bool array of the slots that need an enemy on the target
+    """
+    side = chessgame.TEAM_SIDE[team]
+    targets = np.full((64, len(SLOTS)), OFF, dtype=np.intp)
+    movers = np.zeros((chessgame.KING + 1, len(SLOTS)), dtype=bool)
+    pushes = np.zeros(len(SLOTS), dtype=bool)
+    captures = np.zeros(len(SLOTS), dtype=bool)
+
+    for slot, (kind, direc, steps) in enumerate(SLOTS):
+        if kind == "ray":
+            straight = direc in chessgame.STRAIGHT_VECTORS
+            movers[chessgame.ROOK if straight else chessgame.BISHOP, slot] = True
+            movers[chessgame.QUEEN, slot] = True
+            movers[chessgame.KING, slot] = steps == 1
+        elif kind == "knight":
+            movers[chessgame.KNIGHT, slot] = True
+        else:
+            movers[chessgame.PAWN, slot] = True
+            pushes[slot] = kind == "push"
+            captures[slot] = kind == "capture"
+            # pawn slots are written for a pawn moving down the board, flip them for the team moving up
+            direc = (direc[0] * side, direc[1])
+
+        for square in range(64):
+            row, col = chessgame.TILES[square]
+            # like the Pawn class, a double move is only possible from the starting row, and only needs its target to be empty
+            if kind == "push" and direc[0] * side == 2 and row != chessgame.PAWN_START_ROW[team]:
+                continue
+            end_row, end_col = row + direc[0] * steps, col + direc[1] * steps
+            if (0 <= end_row <= 7) and (0 <= end_col <= 7):
+                targets[square, slot] = end_row * 8 + end_col
+
+    attackers = movers & ~pushes
+    return (targets, movers, attackers, pushes, captures)
+
+TABLES = {chessgame.WHITE: build_tables(chessgame.WHITE), chessgame.BLACK: build_tables(chessgame.BLACK)}
+
+
+def encode_board(board):
+    """
+    Given a ChessBoard or BitBoard, return its position as a (65,) int8 array, the rank of each piece, positive for WHITE and negative for BLACK, followed by the always empty OFF square
+    """
+    squares = np.zeros(65, dtype=np.int8)
+    for square, code in enumerate(board.get_codes()):
+        if code != chessgame.EMPTY:
+            rank = code % 10
+            squares[square] = rank if code - rank == chessgame.WHITE else -rank
+    return squares
+
+def ray_clear(content):
+    """
+    Given an (N, slots) array of the contents of every slot target, return an (N, slots) bool array of which slots have nothing in the way, a ray step is clear when every earlier step of its ray is empty, the other slots are always clear
+    """
+    clear = np.ones(content.shape, dtype=bool)
+    occupied = (content[:, :RAY_SLOTS] != 0).reshape(-1, 8, 7)
+    rays = clear[:, :RAY_SLOTS].reshape(-1, 8, 7)
+    rays[:, :, 1:] = ~np.logical_or.accumulate(occupied, axis=2)[:, :, :-1]
+    clear[:, :RAY_SLOTS] = rays.reshape(-1, RAY_SLOTS)
+    return clear
+
+def king_attacked(boards, sign, tables):
+    """
+    Given an (N, 65) array of boards, and the sign of a team (1 for WHITE, -1 for BLACK) with its tables, return an (N,) bool array of which boards have that teams king attacked. The probe runs outwards from the king square along the slots of the team itself, so a pawn capture slot finds the enemy pawns that attack the king
+    """
+    targets, movers, attackers, pushes, captures = tables
+    relative = boards * np.int8(sign)
+    kings = relative[:, :64] == chessgame.KING
+    king = np.argmax(kings, axis=1)
+
+    content = relative[np.arange(len(boards))[:, None], targets[king]]
+    enemy_rank = np.where(content < 0, -content, 0)
+    hits = attackers[enemy_rank, np.arange(len(SLOTS))] & ray_clear(content) & (targets[king] != OFF)
+    # a board without a king of this team (a variant FRONT_ROW) is never in check
+    return hits.any(axis=1) & kings.any(axis=1)
+
+def pseudo_moves(boards, sign, tables):
+    """
+    Given an (N, 65) array of boards, and the sign of the team to move with its tables, return the (game, org, end) arrays of every pseudo legal move of every board (moves that may still leave the king in check), ordered by game
+    """
+    targets, movers, attackers, pushes, captures = tables
+    relative = boards * np.int8(sign)
+
+    # only the squares holding a piece of the team to move can start a move
+    game, org = np.nonzero(relative[:, :64] > 0)
+    content = relative[game[:, None], targets[org]]
+    target_ok = np.where(pushes, content == 0, np.where(captures, content < 0, content <= 0)) & (targets[org] != OFF)
+    piece, slot = np.nonzero(movers[relative[game, org]] & target_ok & ray_clear(content))
+    return game[piece], org[piece], targets[org[piece], slot]
+
+def apply_moves(boards, org, end):
+    """
+    Return a copy of an (N, 65) array of boards with one move, org[i] to end[i], played on each board i
+    """
+    after = boards.copy()
+    rows = np.arange(len(after))
+    after[rows, end] = after[rows, org]
+    after[rows, org] = 0
+    return after
+
+def legal_moves(boards, sign, tables):
+    """
+    Given an (N, 65) array of boards, and the sign of the team to move with its tables, return the (game, org, end) arrays of every legal move of every board, ordered by game
+    """
+    game, org, end = pseudo_moves(boards, sign, tables)
+    # play every candidate move on its own copy of the board, and keep the ones that leave the king safe
+    safe = ~king_attacked(apply_moves(boards[game], org, end), sign, tables)
+    return game[safe], org[safe], end[safe]
+
+def pick_moves(game, org, end, count, generator):
+    """
+    Given (game, org, end) move arrays ordered by game, for count games, pick one uniformly random move per game. Returns the (picked, has_move) arrays, the index into the move arrays picked for every game, and which games have any moves at all
+    """
+    counts = np.bincount(game, minlength=count)
+    # the moves of game i are the contiguous run starting at offsets[i]
+    offsets = np.cumsum(counts) - counts
+    picked = offsets + (generator.random(count) * counts).astype(np.intp)
+    return np.minimum(picked, len(game) - 1), counts > 0
+
+def sample_moves(boards, sign, tables, generator):
+    """
+    Given an (N, 65) array of boards, and the sign of the team to move with its tables, choose a uniformly random legal move for every board. Pseudo legal moves are sampled and only the sampled move is tested, resampling the boards where it leaves the king in check, a few boards that keep failing get all their legal moves listed instead, which also finds the boards that have none. Returns the (org, end, has_move) arrays
+    """
+    game, org, end = pseudo_moves(boards, sign, tables)
+    chosen_org = np.zeros(len(boards), dtype=np.intp)
+    chosen_end = np.zeros(len(boards), dtype=np.intp)
+    has_move = np.zeros(len(boards), dtype=bool)
+
+    picked, has_pseudo = pick_moves(game, org, end, len(boards), generator)
+    pending = np.nonzero(has_pseudo)[0]
+    for attempt in range(RETRIES):
+        if not pending.size:
+            break
+        # rejecting illegal samples keeps the choice uniform over the legal moves
+        pick = picked[pending]
+        safe = ~king_attacked(apply_moves(boards[pending], org[pick], end[pick]), sign, tables)
+        done = pending[safe]
+        chosen_org[done] = org[pick[safe]]
+        chosen_end[done] = end[pick[safe]]
+        has_move[done] = True
+        pending = pending[~safe]
+        picked, has_pseudo = pick_moves(game, org, end, len(boards), generator)
+
+    if pending.size:
+        game, org, end = legal_moves(boards[pending], sign, tables)
+        pick, has_legal = pick_moves(game, org, end, len(pending), generator)
+        done = pending[has_legal]
+        chosen_org[done] = org[pick[has_legal]]
+        chosen_end[done] = end[pick[has_legal]]
+        has_move[done] = True
+    return chosen_org, chosen_end, has_move
+
+def play_batch(start, team, depth, count, win_score, generator):
+    """
+    Given a (65,) board array, the team to move, a move depth, a number of games and the gamescore of a win, play count random games of depth * 2 plies from the board together, and return an array of their gamescores. A game where the team to move has no legal moves ends there, as a win for the other team if it is in check or a stalemate (0) otherwise, unfinished games are scored by material
+    """
+    boards = np.repeat(start[None, :], count, axis=0)
+    scores = np.zeros(count)
+    # indexes of the games still being played
+    active = np.arange(count)
+
+    # the extra pass after the last ply looks for games the last move ended
+    for ply in range(depth * 2 + 1):
+        sign = 1 if team == chessgame.WHITE else -1
+        org, end, has_move = sample_moves(boards[active], sign, TABLES[team], generator)
+
+        over = active[~has_move]
+        if over.size:
+            in_check = king_attacked(boards[over], sign, TABLES[team])
+            scores[over] = np.where(in_check, -sign * win_score, 0)
+        active = active[has_move]
+        if ply == depth * 2 or not active.size:
+            break
+
+        boards[active, end[has_move]] = boards[active, org[has_move]]
+        boards[active, org[has_move]] = 0
+        team = chessgame.other_team(team)
+
+    scores[active] = VALUES[boards[active, :64] + chessgame.KING].sum(axis=1)
+    return scores
+
+def run_batch(board, team, depth, trials, win_score):
+    """
+    Given a board, team, move depth, number of trials and the gamescore of a win, play trials random games from the board in batches of at most BATCH_SIZE, and return an array of their gamescores. The board itself is not changed
+    """
+    start = encode_board(board)
+    # seed from the random module, which the worker processes reseed, so parallel batches differ
+    generator = np.random.default_rng(random.getrandbits(64))
+    scores = []
+    for first in range(0, trials, BATCH_SIZE):
+        scores.append(play_batch(start, team, depth, min(BATCH_SIZE, trials - first), win_score, generator))
+    return np.concatenate(scores)
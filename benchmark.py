@@ -0,0 +1,162 @@
+"""
+Benchmark suite for the chess core, reports perft node counts and nodes per second from a set of fixed positions, and timings of the board methods and monte carlo functions the search spends its time in. Run it headless with python benchmark.py, every performance change should come with a before and after run of this script
+"""
+
+import argparse
+import concurrent.futures
+import random
+import time
+import chessClass as chessgame
+import monteCarlo
+
+BOARDS = {"ChessBoard": chessgame.ChessBoard, "BitBoard": chessgame.BitBoard, "MailboxBoard": chessgame.MailboxBoard}
+# cache modes the benchmarks can run in, with the check_win and move list caches on (emptied before each perft count or timing) or off
+CACHE_MODES = {"cached": True, "uncached": False}
+
+# fixed positions, given as the team to move and the list of moves played from the starting position
+POSITIONS = {
+    "start": (chessgame.WHITE, []),
+    "italian": (chessgame.WHITE, [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)), ((7, 5), (4, 2)), ((0, 5), (3, 2))]),
+    "middlegame": (chessgame.WHITE, [((6, 3), (4, 3)), ((1, 3), (3, 3)), ((6, 2), (4, 2)), ((1, 4), (2, 4)), ((7, 1), (5, 2)), ((0, 6), (2, 5)),
+                                     ((7, 2), (3, 6)), ((0, 5), (1, 4)), ((6, 4), (5, 4)), ((3, 3), (4, 2)), ((7, 5), (4, 2)), ((1, 2), (3, 2)),
+                                     ((4, 3), (3, 2)), ((0, 3), (3, 0))]),
+}
+
+# perft node counts of this engine for each position by depth, the engine has no castling, en passant or promotion, and a pawn double move only needs its target to be empty, so these differ from the usual perft tables
+EXPECTED = {
+    "start": [1, 20, 400, 8982, 200915],
+    "italian": [1, 33, 1153, 37490, 1299676],
+    "middlegame": [1, 48, 1632, 75042, 2656222],
+}
+
+# move depth and trials of the run_trial and monte_carlo timings
+SIM_DEPTH = 2
+SIM_TRIALS = 5
+
+
+def use_caches(enabled):
+    """
+    Replace the check_win cache and the ChessBoard move cache with empty ones, of their usual size if enabled, otherwise of size 0 so every lookup misses and the work is always done
+    """
+    chessgame.TERMINAL_CACHE = chessgame.LRUCache(chessgame.TERMINAL_CACHE_SIZE if enabled else 0)
+    chessgame.ChessBoard.set_move_cache_size(chessgame.MOVE_CACHE_SIZE if enabled else 0)
+
+def setup_position(board_class, name):
+    """
+    Given a board class and the name of one of the POSITIONS, return a new board of that class with the position played out, and the team to move
+    """
+    team, moves = POSITIONS[name]
+    board = board_class()
+    for move in moves:
+        board.apply_move(move[0], move[1])
+    return board, team
+
+def perft(board, team, depth):
+    """
+    Given a board, the team to move and a depth, return the number of leaf positions reached by playing every legal move sequence of that many plies. The board is left unchanged
+    """
+    if depth == 0:
+        return 1
+    moves = board.get_all_moves(team)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.apply_move(move[0], move[1])
+        nodes += perft(board, chessgame.other_team(team), depth - 1)
+        board.unmake_move()
+    return nodes
+
+def perft_move(board, team, depth, move, cached=True):
+    """
+    Given a board, the team to move, a depth and one root move, return the perft count below that move with the caches on or off, used by the worker processes of parallel_perft
+    """
+    use_caches(cached)
+    board.apply_move(move[0], move[1])
+    return perft(board, chessgame.other_team(team), depth - 1)
+
+def parallel_perft(board, team, depth, workers, cached=True):
+    """
+    Given a board, the team to move, a depth, a number of worker processes and whether the caches are on, return the perft count, splitting the root moves between the workers
+    """
+    if depth < 2 or workers < 2:
+        return perft(board, team, depth)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(perft_move, board.clone(), team, depth, move, cached) for move in board.get_all_moves(team)]
+        return sum(future.result() for future in futures)
+
+def time_call(function, number):
+    """
+    Given a function taking no arguments and a number of calls, return the average time of one call in seconds
+    """
+    start = time.perf_counter()
+    for dummy_num in range(number):
+        function()
+    return (time.perf_counter() - start) / number
+
+def run_perft(board_class, depth, workers, mode="uncached"):
+    """
+    Given a board class, a maximum depth, a number of worker processes and one of the CACHE_MODES, print the perft node count and nodes per second of every position up to that depth, and whether the count matches EXPECTED. Each count starts from empty caches, so the cached mode only gains from positions repeated within that count
+    """
+    for name in POSITIONS:
+        for ply in range(1, depth + 1):
+            use_caches(CACHE_MODES[mode])
+            board, team = setup_position(board_class, name)
+            start = time.perf_counter()
+            nodes = parallel_perft(board, team, ply, workers, CACHE_MODES[mode])
+            elapsed = time.perf_counter() - start
+            expected = EXPECTED[name][ply] if ply < len(EXPECTED[name]) else None
+            status = "" if expected == None else (" ok" if nodes == expected else f" MISMATCH (expected {expected})")
+            print(f"perft {name:<12} {mode:<9} depth {ply}: {nodes:>10} nodes {nodes / elapsed:>12.0f} nodes/s{status}")
+
+def run_timings(board_class, number, mode="uncached"):
+    """
+    Given a board class, a number of calls and one of the CACHE_MODES, print the average time of the board methods and monte carlo functions on every position. Each timing starts from empty caches, in the cached mode the repeated calls of check_win and get_all_moves then mostly measure cache hits
+    """
+    for name in POSITIONS:
+        board, team = setup_position(board_class, name)
+        move = board.get_all_moves(team)[0]
+
+        def apply_unmake():
+            board.apply_move(move[0], move[1])
+            board.unmake_move()
+
+        timings = [
+            ("clone", lambda: board.clone(), number),
+            ("apply_move + unmake_move", apply_unmake, number),
+            ("get_all_moves", lambda: board.get_all_moves(team), number),
+            ("is_check", lambda: board.is_check(team), number),
+            ("check_win", lambda: board.check_win(), number),
+            ("run_trial", lambda: monteCarlo.run_trial(board, team, SIM_DEPTH), max(1, number // 20)),
+            ("monte_carlo", lambda: monteCarlo.monte_carlo(board, team, SIM_DEPTH, SIM_TRIALS, workers=1, table=None, book=None), 1),
+        ]
+        for label, function, calls in timings:
+            use_caches(CACHE_MODES[mode])
+            seconds = time_call(function, calls)
+            print(f"time  {name:<12} {mode:<9} {label:<25} {seconds * 1e6:>12.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft and timing benchmarks for the chess core")
+    parser.add_argument("--board", choices=sorted(BOARDS), action="append", help="board class to benchmark, can be repeated (default: all)")
+    parser.add_argument("--depth", type=int, default=3, help="maximum perft depth (default: 3)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes to split the perft root moves between (default: 1)")
+    parser.add_argument("--number", type=int, default=200, help="calls per board method timing (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the rollout timings (default: 0)")
+    parser.add_argument("--skip-perft", action="store_true", help="only run the timings")
+    parser.add_argument("--skip-timings", action="store_true", help="only run perft")
+    parser.add_argument("--cache", choices=sorted(CACHE_MODES) + ["both"], default="both", help="run with the check_win and move list caches on, off, or both one after the other (default: both)")
+    args = parser.parse_args()
+
+    modes = list(CACHE_MODES) if args.cache == "both" else [args.cache]
+    random.seed(args.seed)
+    for board_name in args.board or BOARDS:
+        print(f"== {board_name}")
+        for mode in modes:
+            if not args.skip_perft:
+                run_perft(BOARDS[board_name], args.depth, args.workers, mode)
+            if not args.skip_timings:
+                run_timings(BOARDS[board_name], args.number, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 Classes and constants needed to run the chessgame itself, technically no gui is needed here as all functionality for the chess mechanics is here
 """
 
+import collections
+import random
+import threading
+
 # Constants
 EMPTY = 0
 PAWN = 1
@@ -25,12 +29,26 @@ STRMAP = {EMPTY: "   ", PAWN: "Pa", ROOK: "Ro",
          KNIGHT: "Kn", BISHOP: "Bi", QUEEN: "Qu", KING: "Ki", WHITE: "w", BLACK: "b"}
 # Maping teams to constants for direction calculations
 TEAM_SIDE = {BLACK: 1, WHITE: -1}
+# Material value of each piece rank, the same values the piece classes hold in _value
+PIECE_VALUES = {PAWN: 1, ROOK: 5, KNIGHT: 3, BISHOP: 3, QUEEN: 9, KING: 0}
+# Row each teams pawns start on, which is the only row a pawn can make a double move from
+PAWN_START_ROW = {BLACK: 1, WHITE: 6}
+# number of positions whose move lists ChessBoard keeps in its move cache
+MOVE_CACHE_SIZE = 10000
+# Signed material value of each piece code (team + rank)
+CODE_VALUES = {team + rank: PIECE_VALUES[rank] * (1 if team == WHITE else -1) for team in (WHITE, BLACK) for rank in PIECE_VALUES}
+# Vectors used to probe outwards from a square for attackers
+STRAIGHT_VECTORS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+DIAGONAL_VECTORS = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+KNIGHT_VECTORS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (-1, -2), (1, -2), (-1, 2), (1, 2)]
 
 
 class ChessPiece:
     '''
     class to represent the chess pieces themselves, this is a parent class with shared methods, classes for each individual piece are below, and hold information on the types of moves they can make
     '''
+    __slots__ = ('_team', '_rank', '_value')
+
     def __init__(self, team):
         self._team = team
     
@@ -61,13 +79,12 @@ class Pawn(ChessPiece):
     """
     class representation of the PAWN chesspiece
     """
+    __slots__ = ('_is_moved',)
+
     def __init__(self, team, is_moved=False):
         ChessPiece.__init__(self, team)
         # this is the only piece with the is_moved flag, since a pawn can move two spaces if it is its first move
         self._is_moved = is_moved
-        self._vectors = [(TEAM_SIDE[self._team], 0), (TEAM_SIDE[self._team], 1), (TEAM_SIDE[self._team], -1)]
-        if not self._is_moved:
-            self._vectors.append((TEAM_SIDE[self._team] * 2, 0))
         self._rank = PAWN
         self._value = 1
 
@@ -78,30 +95,35 @@ class Pawn(ChessPiece):
         return Pawn(self._team, self._is_moved)
 
     def moved(self):
-        if self._is_moved == False:
-            self._is_moved = True
-            self._vectors.pop()
+        self._is_moved = True
+
+    def unmoved(self):
+        self._is_moved = False
 
     def get_moves(self, board, position):
         p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 1, board):
-                target = board._board[tile[0]][tile[1]]
-                if direc[1] == 0:
-                    if target == EMPTY:
-                        p_moves.append(tile)
-                else: 
-                    if (target != EMPTY) and (target.get_team() != self.get_team()):
-                        p_moves.append(tile)
+        for tile in PAWN_STEP_TILES[self._team][position[0]][position[1]]:
+            if board._board[tile[0]][tile[1]] == EMPTY:
+                p_moves.append(tile)
+        for tile in PAWN_CAPTURE_TILES[self._team][position[0]][position[1]]:
+            target = board._board[tile[0]][tile[1]]
+            if (target != EMPTY) and (target.get_team() != self.get_team()):
+                p_moves.append(tile)
+        # like the first move vector it replaces, the double move only needs its target tile to be empty
+        if not self._is_moved:
+            for tile in PAWN_DOUBLE_TILES[self._team][position[0]][position[1]]:
+                if board._board[tile[0]][tile[1]] == EMPTY:
+                    p_moves.append(tile)
         return p_moves 
 
 class Knight(ChessPiece):
     """
     class representation of the KNIGHT chesspiece
     """
+    __slots__ = ()
+
     def __init__(self, team):
         ChessPiece.__init__(self, team)
-        self._vectors = [(2, 1), (2, -1), (-2, 1), (-2, -1), (-1, -2), (1, -2), (-1, 2), (1, 2)]
         self._rank = KNIGHT
         self._value = 3
 
@@ -113,19 +135,19 @@ class Knight(ChessPiece):
     
     def get_moves(self, board, position):
         p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 1, board):
-                if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
-                    p_moves.append(tile)
+        for tile in KNIGHT_TILES[position[0]][position[1]]:
+            if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
+                p_moves.append(tile)
         return p_moves 
 
 class Bishop(ChessPiece):
     """
     class representation of the BISHOP chesspiece
     """
+    __slots__ = ()
+
     def __init__(self, team):
         ChessPiece.__init__(self, team)
-        self._vectors = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
         self._rank = BISHOP
         self._value = 3
 
@@ -136,21 +158,16 @@ class Bishop(ChessPiece):
         return Bishop(self._team)
     
     def get_moves(self, board, position):
-        p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 7, board):
-                target = board._board[tile[0]][tile[1]]
-                if (target == EMPTY) or (target.get_team() != self.get_team()):
-                    p_moves.append(tile)
-        return p_moves 
+        return slide_moves(board, position, DIAGONAL_RAY_TILES, self._team)
 
 class Rook(ChessPiece):
     """
     class representation of the ROOK chesspiece
     """
+    __slots__ = ()
+
     def __init__(self, team):
         ChessPiece.__init__(self, team)
-        self._vectors = [(0, 1), (0, -1), (1, 0), (-1, 0)]
         self._rank = ROOK
         self._value = 5
     
@@ -161,20 +178,16 @@ class Rook(ChessPiece):
         return Rook(self._team)
     
     def get_moves(self, board, position):
-        p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 7, board):
-                if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
-                    p_moves.append(tile)
-        return p_moves 
+        return slide_moves(board, position, STRAIGHT_RAY_TILES, self._team)
 
 class Queen(ChessPiece):
     """
     class representation of the QUEEN chesspiece
     """
+    __slots__ = ()
+
     def __init__(self, team):
         ChessPiece.__init__(self, team)
-        self._vectors = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1)]
         self._rank = QUEEN
         self._value = 9
 
@@ -185,20 +198,16 @@ class Queen(ChessPiece):
         return Queen(self._team)
       
     def get_moves(self, board, position):
-        p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 7, board):
-                if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
-                    p_moves.append(tile)
-        return set(p_moves)
+        return slide_moves(board, position, STRAIGHT_RAY_TILES, self._team) + slide_moves(board, position, DIAGONAL_RAY_TILES, self._team)
 
 class King(ChessPiece):
     """
     class representation of the KING chesspiece
     """
+    __slots__ = ()
+
     def __init__(self, team):
         ChessPiece.__init__(self, team)
-        self._vectors = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1)]
         self._rank = KING
         self._value = 0
 
@@ -210,24 +219,110 @@ class King(ChessPiece):
           
     def get_moves(self, board, position):
         p_moves = []
-        for direc in self._vectors:
-            for tile in traverse_grid(position, direc, 1, board):
-                if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
-                    p_moves.append(tile)
+        for tile in KING_TILES[position[0]][position[1]]:
+            if (board._board[tile[0]][tile[1]] == EMPTY) or (board._board[tile[0]][tile[1]].get_team() != self.get_team()):
+                p_moves.append(tile)
         return p_moves
 
 class Empty(ChessPiece):
+    __slots__ = ()
+
     def __init__(self, team, tile):
         ChessPiece.__init__(team, tile)
-        self._vectors = []
         self._rank = EMPTY
 
+class SharedPiece:
+    """
+    Base of the shared PIECES flyweights, mixed into a copy of each piece class by shared_piece. One flyweight stands for every piece of its code on every board, so any change to it raises AttributeError, including moved and unmoved, rather than silently changing every board
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self} is a shared flyweight piece and cannot be changed")
 
+    def __delattr__(self, name):
+        raise AttributeError(f"{self} is a shared flyweight piece and cannot be changed")
+
+    def moved(self):
+        raise AttributeError(f"{self} is a shared flyweight piece and cannot be moved, the board keeps the moved state")
+
+    def unmoved(self):
+        raise AttributeError(f"{self} is a shared flyweight piece and cannot be moved, the board keeps the moved state")
+
+def shared_piece(piece):
+    """
+    Given a piece, return an immutable SharedPiece copy of it, the slots are filled directly as SharedPiece refuses to set them
+    """
+    shared = object.__new__(SHARED_PIECE_CLASSES[piece.get_rank()])
+    for piece_class in type(piece).__mro__:
+        for slot in piece_class.__dict__.get('__slots__', ()):
+            object.__setattr__(shared, slot, getattr(piece, slot))
+    return shared
+
+
+class LRUCache:
+    """
+    Bounded dictionary that drops its least recently used entry once it holds more than size entries, and counts its hits and misses. Every method holds the cache's lock, so one cache can be shared by the GUI thread and a search thread
+    """
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Return the value stored under key, or default if it is not in the cache
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Store value under key, evicting the least recently used entry if the cache is full
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every entry and reset the hit and miss counts
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+# marks a key missing from an LRUCache, since None can be a stored value
+_MISSING = object()
 
 class ChessBoard:
     """
-    Class to represent a Chess board, the chessboard deals with all the interactions between pieces, and the location of the pieces themselves. The only place where a piece location is stored is on the board itself, so that there is a single source of truth.
+    Class to represent a Chess board, the chessboard deals with all the interactions between pieces, and the location of the pieces themselves. The grid is the source of truth for piece locations, the board also keeps a piece to position index that apply_move, unmake_move and remove_piece keep in sync with the grid, so a piece can be located without scanning the board.
     """
+    __slots__ = ('_dim', 'dead_pieces', 'team_black', 'team_white', '_score', '_history', '_positions', '_kings', '_hash', '_board')
+    # move lists of recently seen positions, shared by every ChessBoard (the GUI board, its clones and the search boards), keyed by the zobrist hash together with the team for get_all_moves or the tile for get_legal_moves, as a position always has the same moves it never needs invalidating
+    move_cache = LRUCache(MOVE_CACHE_SIZE)
+
+    @classmethod
+    def set_move_cache_size(cls, size):
+        """
+        Replace the shared move cache with an empty one holding up to size positions
+        """
+        cls.move_cache = LRUCache(size)
 
     def __init__(self, board = None, dead_pieces = None):
         """
@@ -238,7 +333,16 @@ class ChessBoard:
         self.dead_pieces = []
         self.team_black = []
         self.team_white = []
+        # running material score, updated by apply_move and unmake_move whenever a piece is captured
         self._score = 0
+        # stack of undo records, one per applied move, so unmake_move can revert the board in place
+        self._history = []
+        # index of piece -> (row, col), the reverse of the grid itself which maps (row, col) -> piece
+        self._positions = {}
+        # each teams king, so check detection can start from its square
+        self._kings = {}
+        # zobrist hash of the piece placement, updated by apply_move and unmake_move
+        self._hash = 0
 
         if board == None:
             # Create empty board
@@ -294,6 +398,14 @@ class ChessBoard:
                     self._board[self._dim - 1][col] = Queen(WHITE)
                     self.team_white.append(self._board[self._dim - 1][col])
 
+            # index the starting position of every piece, and add up the starting score
+            for row in (0, 1, self._dim - 2, self._dim - 1):
+                for col in range(self._dim):
+                    self._positions[self._board[row][col]] = (row, col)
+                    self._score += self._board[row][col].get_value()
+                    self._hash ^= ZOBRIST_KEYS[self._board[row][col].get_team() + self._board[row][col].get_rank()][row * self._dim + col]
+                    if self._board[row][col].get_rank() == KING:
+                        self._kings[self._board[row][col].get_team()] = self._board[row][col]
 
         else:
             # if we are given a chessboard to make a clone of, then we fill our new board with cloned chess pieces int he appropriate locations
@@ -303,6 +415,11 @@ class ChessBoard:
                     if board[row][col] != EMPTY:
                         piece = board[row][col].clone()
                         self._board[row][col] = piece
+                        self._positions[piece] = (row, col)
+                        self._score += piece.get_value()
+                        self._hash ^= ZOBRIST_KEYS[piece.get_team() + piece.get_rank()][row * self._dim + col]
+                        if piece.get_rank() == KING:
+                            self._kings[piece.get_team()] = piece
                         if piece.get_team() == WHITE:
                             self.team_white.append(piece)
                         else:
@@ -379,16 +496,9 @@ class ChessBoard:
         
     def get_position(self, piece):
         """
-        Given a chess piece object, return the position of that object on the board.
+        Given a chess piece object, return the position of that object on the board, or (None, None) if it is not on the board.
         """
-        row = None
-        col = None
-        for idx, value in enumerate(self._board):
-            if piece in value:
-                row = idx
-                col = value.index(piece)
-                break
-        return (row, col)         
+        return self._positions.get(piece, (None, None))
 
     def get_dim(self):
         """
@@ -396,6 +506,26 @@ class ChessBoard:
         """
         return self._dim
 
+    def get_hash(self):
+        """
+        Return the zobrist hash of the piece placement, equal for equal positions (on either board class) whatever moves led to them. The side to move is not part of the board, so it is not part of the hash either
+        """
+        return self._hash
+
+    def get_codes(self):
+        """
+        Return a flat list of 64 square codes, row by row, holding team + rank for a piece or EMPTY for an empty square
+        """
+        codes = []
+        for row in range(self._dim):
+            for col in range(self._dim):
+                piece = self._board[row][col]
+                if piece == EMPTY:
+                    codes.append(EMPTY)
+                else:
+                    codes.append(piece.get_team() + piece.get_rank())
+        return codes
+
     def get_empty_squares(self):
         """
         Return a list of (row, col) tuples for all empty squares
@@ -411,36 +541,114 @@ class ChessBoard:
         """
         Return the current game score of the board
         """
-        score = 0 
-        for row in range(self._dim):
-            for col in range(self._dim):
-                if self._board[row][col] != EMPTY:
-                    score += self._board[row][col].get_value()
-        return score
+        return self._score
 
 
     def get_legal_moves(self, org_tile):
         """
         Return a list all legal moves for a piece at a given tile
         """
-        held_piece = self._board[org_tile[0]][org_tile[1]]
-        legal_moves = held_piece.get_moves(self, self.get_position(held_piece))
-        for move in list(legal_moves):
-            clone_board = self.clone()
-            clone_board.apply_move(org_tile, move)
-            if clone_board.is_check(held_piece.get_team()):
-                legal_moves.remove(move)
-        return set(legal_moves)
+        key = (self._hash, org_tile)
+        moves = self.move_cache.get(key)
+        if moves == None:
+            held_piece = self._board[org_tile[0]][org_tile[1]]
+            check_info = self.get_check_info(held_piece.get_team())
+            moves = frozenset(self._legal_targets(held_piece, org_tile, check_info))
+            self.move_cache.put(key, moves)
+        return set(moves)
+
+    def get_check_info(self, team):
+        """
+        Find the pieces checking and pinning the given teams king, probing outwards from the king square. Returns a tuple of
+            the number of pieces giving check,
+            the set of tiles a non king move has to land on to answer a single check (capturing the checker or blocking its ray), or None if not in check,
+            a dictionary of pinned piece -> set of tiles it can move to without leaving its pin ray
+        """
+        position = self.get_position(self._kings.get(team))
+        if position[0] == None:
+            return (0, None, {})
+        row, col = position
+        checkers = 0
+        block = None
+        pins = {}
+
+        for vectors, slider in ((STRAIGHT_VECTORS, ROOK), (DIAGONAL_VECTORS, BISHOP)):
+            for direc in vectors:
+                ray = []
+                shield = None
+                step_row, step_col = row + direc[0], col + direc[1]
+                while (0 <= step_row <= 7) and (0 <= step_col <= 7):
+                    piece = self._board[step_row][step_col]
+                    ray.append((step_row, step_col))
+                    if piece != EMPTY:
+                        if piece.get_team() == team:
+                            # a second piece of our own along the ray means nothing behind it can pin
+                            if shield != None:
+                                break
+                            shield = piece
+                        else:
+                            rank = piece.get_rank()
+                            if (rank == slider) or (rank == QUEEN) or (rank == KING and len(ray) == 1):
+                                if shield == None:
+                                    checkers += 1
+                                    block = set(ray)
+                                else:
+                                    pins[shield] = set(ray)
+                            break
+                    step_row += direc[0]
+                    step_col += direc[1]
+
+        for direc in KNIGHT_VECTORS:
+            if (0 <= row + direc[0] <= 7) and (0 <= col + direc[1] <= 7):
+                piece = self._board[row + direc[0]][col + direc[1]]
+                if (piece != EMPTY) and (piece.get_team() != team) and (piece.get_rank() == KNIGHT):
+                    checkers += 1
+                    block = {(row + direc[0], col + direc[1])}
+
+        pawn_row = row + TEAM_SIDE[team]
+        if 0 <= pawn_row <= 7:
+            for pawn_col in (col - 1, col + 1):
+                if 0 <= pawn_col <= 7:
+                    piece = self._board[pawn_row][pawn_col]
+                    if (piece != EMPTY) and (piece.get_team() != team) and (piece.get_rank() == PAWN):
+                        checkers += 1
+                        block = {(pawn_row, pawn_col)}
+
+        return (checkers, block, pins)
+
+    def _legal_targets(self, piece, position, check_info):
+        """
+        Return a list of the legal moves of a piece at a given position, given the check information of its team from get_check_info. Only king moves need an attack test, every other piece is filtered by the check and pin masks
+        """
+        checkers, block, pins = check_info
+        moves = piece.get_moves(self, position)
+        if piece.get_rank() == KING:
+            enemy = other_team(piece.get_team())
+            # lift the king off the board while testing, so it does not hide the squares behind it on a checking ray
+            self._board[position[0]][position[1]] = EMPTY
+            legal_moves = [move for move in moves if not self.is_attacked(move, enemy)]
+            self._board[position[0]][position[1]] = piece
+            return legal_moves
+
+        # in double check only the king can move
+        if checkers > 1:
+            return []
+        if block != None:
+            moves = [move for move in moves if move in block]
+        if piece in pins:
+            moves = [move for move in moves if move in pins[piece]]
+        return moves
 
     def remove_piece(self, piece):
         """
-        Given a piece, remove that piece from its team list
+        Given a piece, remove that piece from its team list and the position index
         """
         team = piece.get_team()
         if team == WHITE:
             self.team_white.remove(piece)
         else:
             self.team_black.remove(piece)
+        self._positions.pop(piece, None)
 
     def apply_move(self, org_tile, end_tile):
         """
@@ -449,51 +657,139 @@ class ChessBoard:
         held_piece = self._board[org_tile[0]][org_tile[1]]
         string = (f"MOVE: {STRMAP[held_piece.get_team()]}{STRMAP[held_piece.get_rank()]} {str(org_tile)} --> {str(end_tile)}")
 
-        # if the target square holds an enemy piece, "kill" that piece   
-        if self._board[end_tile[0]][end_tile[1]] != EMPTY:
-            self.dead_pieces.append(self._board[end_tile[0]][end_tile[1]])
-            self.remove_piece(self._board[end_tile[0]][end_tile[1]])
+        # if the target square holds an enemy piece, "kill" that piece, remembering where it sat in its team list   
+        captured = self._board[end_tile[0]][end_tile[1]]
+        captured_index = None
+        if captured != EMPTY:
+            captured_index = self.get_team_list(captured.get_team()).index(captured)
+            self.dead_pieces.append(captured)
+            self.remove_piece(captured)
+            self._score -= captured.get_value()
+            self._hash ^= ZOBRIST_KEYS[captured.get_team() + captured.get_rank()][end_tile[0] * self._dim + end_tile[1]]
 
         self._board[end_tile[0]][end_tile[1]] = held_piece
         self._board[org_tile[0]][org_tile[1]] = EMPTY
+        self._positions[held_piece] = end_tile
+        keys = ZOBRIST_KEYS[held_piece.get_team() + held_piece.get_rank()]
+        self._hash ^= keys[org_tile[0] * self._dim + org_tile[1]] ^ keys[end_tile[0] * self._dim + end_tile[1]]
         
         # if the moved piece was a pawn, set the moved flag to True
+        first_move = False
         if held_piece.get_rank() == PAWN:
+            first_move = not held_piece._is_moved
             held_piece.moved()
 
+        self._history.append((org_tile, end_tile, captured, captured_index, first_move))
         return string
+
+    def unmake_move(self):
+        """
+        Revert the last move made with apply_move, using the undo record it left on the history stack.
+        """
+        org_tile, end_tile, captured, captured_index, first_move = self._history.pop()
+        held_piece = self._board[end_tile[0]][end_tile[1]]
+        self._board[org_tile[0]][org_tile[1]] = held_piece
+        self._board[end_tile[0]][end_tile[1]] = captured
+        self._positions[held_piece] = org_tile
+        keys = ZOBRIST_KEYS[held_piece.get_team() + held_piece.get_rank()]
+        self._hash ^= keys[org_tile[0] * self._dim + org_tile[1]] ^ keys[end_tile[0] * self._dim + end_tile[1]]
+
+        # bring a "killed" piece back to life, in the same place in its team list
+        if captured != EMPTY:
+            self.dead_pieces.pop()
+            self.get_team_list(captured.get_team()).insert(captured_index, captured)
+            self._positions[captured] = end_tile
+            self._score += captured.get_value()
+            self._hash ^= ZOBRIST_KEYS[captured.get_team() + captured.get_rank()][end_tile[0] * self._dim + end_tile[1]]
+
+        if first_move:
+            held_piece.unmoved()
     
+    def is_attacked(self, tile, by_team):
+        """
+        check if the given tile is attacked by any piece of by_team, probing outwards from the tile along the eight rays, the knight jumps and the pawn diagonals, and stopping at the first attacker found
+        """
+        row, col = tile
+        for vectors, slider in ((STRAIGHT_VECTORS, ROOK), (DIAGONAL_VECTORS, BISHOP)):
+            for direc in vectors:
+                step_row, step_col = row + direc[0], col + direc[1]
+                steps = 1
+                while (0 <= step_row <= 7) and (0 <= step_col <= 7):
+                    piece = self._board[step_row][step_col]
+                    if piece != EMPTY:
+                        # the first piece along a ray is the only one that can attack along it
+                        if piece.get_team() == by_team:
+                            rank = piece.get_rank()
+                            if (rank == slider) or (rank == QUEEN) or (rank == KING and steps == 1):
+                                return True
+                        break
+                    step_row += direc[0]
+                    step_col += direc[1]
+                    steps += 1
+
+        for direc in KNIGHT_VECTORS:
+            if (0 <= row + direc[0] <= 7) and (0 <= col + direc[1] <= 7):
+                piece = self._board[row + direc[0]][col + direc[1]]
+                if (piece != EMPTY) and (piece.get_team() == by_team) and (piece.get_rank() == KNIGHT):
+                    return True
+
+        # an attacking pawn sits one row behind the tile, from its own direction of travel, on either side
+        pawn_row = row - TEAM_SIDE[by_team]
+        if 0 <= pawn_row <= 7:
+            for pawn_col in (col - 1, col + 1):
+                if 0 <= pawn_col <= 7:
+                    piece = self._board[pawn_row][pawn_col]
+                    if (piece != EMPTY) and (piece.get_team() == by_team) and (piece.get_rank() == PAWN):
+                        return True
+        return False
+
     def is_check(self, team):
         """
         check if the given team is in check, returning either True or False
         """
-        if team == WHITE:
-            for piece in self.team_black:
-                for move in piece.get_moves(self, self.get_position(piece)):
-                    if self._board[move[0]][move[1]] != EMPTY:
-                        if self._board[move[0]][move[1]].get_rank() == KING:
-                            return True
-        if team == BLACK:
-            for piece in self.team_white:
-                for move in piece.get_moves(self, self.get_position(piece)):
-                    if self._board[move[0]][move[1]] != EMPTY:
-                        if self._board[move[0]][move[1]].get_rank() == KING:
-                            return True
-        return False
+        position = self.get_position(self._kings.get(team))
+        if position[0] == None:
+            return False
+        return self.is_attacked(position, other_team(team))
     
     def is_stale(self, team):
         """
         check if the given team is stale, meaning if they can make no moves without putting themselves in check, returning either True or False
         """
-        roster = self.get_team_list(team)
-        for piece in roster:
-            position = self.get_position(piece)
-            for move in self.get_legal_moves(position):
-                clone_board = self.clone()
-                clone_board.apply_move(position, move)
-                if clone_board.is_check(piece.get_team()) == False:
-                    return False
+        check_info = self.get_check_info(team)
+        # the other pieces only need the check and pin masks, so try them before the king, whose moves each need an attack test
+        king = self._kings.get(team)
+        for piece in self.get_team_list(team):
+            if piece != king and self._has_legal_move(piece, self.get_position(piece), check_info):
+                return False
+        if king != None and self._has_legal_move(king, self.get_position(king), check_info):
+            return False
         return True
+
+    def _has_legal_move(self, piece, position, check_info):
+        """
+        Return True if the piece at the given position has any legal move, stopping at the first one found, given the check information of its team from get_check_info
+        """
+        checkers, block, pins = check_info
+        if piece.get_rank() == KING:
+            enemy = other_team(piece.get_team())
+            # lift the king off the board while testing, as in _legal_targets
+            self._board[position[0]][position[1]] = EMPTY
+            found = False
+            for move in piece.get_moves(self, position):
+                if not self.is_attacked(move, enemy):
+                    found = True
+                    break
+            self._board[position[0]][position[1]] = piece
+            return found
+
+        if checkers > 1:
+            return False
+        pinned = pins.get(piece)
+        for move in piece.get_moves(self, position):
+            if (block == None or move in block) and (pinned == None or move in pinned):
+                return True
+        return False
     
     def check_win(self, mc = False):
         """
@@ -503,35 +799,34 @@ class ChessBoard:
             returns BLACK if black team has won,
             returns DRAW if there is a stalemate
         """
-        
-        if self.is_stale(WHITE):
-            if self.is_check(WHITE):
-                return BLACK
-            else:
-                return DRAW
-        elif self.is_stale(BLACK):
-            if self.is_check(BLACK):
-                return WHITE
-            else:
-                return DRAW
-        else:
-            return False
+        return cached_winner(self)
     
     def get_all_moves(self, team):
         """
-        given a team, returns all possible moves that team could make
+        given a team, returns all possible moves that team could make, as a new list the caller may change
+        """
+        key = (self._hash, team)
+        moves = self.move_cache.get(key)
+        if moves == None:
+            check_info = self.get_check_info(team)
+            moves = []
+            for piece in self.get_team_list(team):
+                position = self.get_position(piece)
+                for move in self._legal_targets(piece, position, check_info):
+                    moves.append((position, move))
+            moves = tuple(moves)
+            self.move_cache.put(key, moves)
+        return list(moves)
+
+    def get_pseudo_moves(self, team):
+        """
+        given a team, returns all the moves that team's pieces can make without checking whether they leave its king in check, a caller can test a move with apply_move, is_check and unmake_move
         """
-        if team == WHITE:
-            team_list = self.team_white
-        else:
-            team_list = self.team_black
         moves = []
-        moves_str = ""
-        for piece in team_list:
+        for piece in self.get_team_list(team):
             position = self.get_position(piece)
-            for move in self.get_legal_moves(position):
+            for move in piece.get_moves(self, position):
                 moves.append((position, move))
-                moves_str += f"{str(piece)}{str(position)} --> {str(move)}, "
         return moves
         
     def clone(self):
@@ -540,6 +835,605 @@ class ChessBoard:
         """
         return ChessBoard(self._board, self.dead_pieces)
 
+class BitBoard:
+    """
+    Alternative chessboard backed by 64 bit integers, one per piece type and team, where square (row, col) is bit row * 8 + col. Moves are found with the precomputed attack and ray tables at the bottom of this module instead of walking the grid, and the board exposes the same get_all_moves / apply_move / is_check / check_win / get_score surface as ChessBoard, so the monte carlo search can run on either one.
+    """
+    __slots__ = ('_dim', '_bb', '_mailbox', '_history', '_hash')
+
+    def __init__(self, board = None):
+        """
+        Initialize the bitboards with the starting position, or copy the position of a given ChessBoard or BitBoard.
+        """
+        self._dim = 8
+
+        if isinstance(board, BitBoard):
+            # cloning another bitboard is just a copy of its lists
+            self._bb = {WHITE: board._bb[WHITE][:], BLACK: board._bb[BLACK][:]}
+            self._mailbox = board._mailbox[:]
+            self._history = []
+            self._hash = board._hash
+            return
+
+        # one list per team, index 0 holds the occupancy of the whole team and indexes PAWN to KING hold each piece type
+        self._bb = {WHITE: [0] * 7, BLACK: [0] * 7}
+        # flat list of square codes (team + rank, or EMPTY), so the piece on a square is known without testing every bitboard
+        self._mailbox = [EMPTY] * (self._dim * self._dim)
+        # stack of (org, end, captured code) undo records for unmake_move
+        self._history = []
+        # zobrist hash of the piece placement, updated along with the bitboards
+        self._hash = 0
+
+        if board == None:
+            for col in range(self._dim):
+                self._place(BLACK, PAWN, 1, col)
+                self._place(WHITE, PAWN, self._dim - 2, col)
+                self._place(BLACK, FRONT_ROW[col], 0, col)
+                self._place(WHITE, FRONT_ROW[col], self._dim - 1, col)
+        else:
+            # convert a ChessBoard, pawns on their starting row are the only ones allowed a double move, exactly as for the unmoved Pawn objects
+            for row in range(self._dim):
+                for col in range(self._dim):
+                    piece = board.get_square(row, col)
+                    if piece != EMPTY:
+                        self._place(piece.get_team(), piece.get_rank(), row, col)
+
+    def _place(self, team, rank, row, col):
+        """
+        Put a piece of the given team and rank on an empty square.
+        """
+        square = row * self._dim + col
+        self._bb[team][rank] |= 1 << square
+        self._bb[team][0] |= 1 << square
+        self._mailbox[square] = team + rank
+        self._hash ^= ZOBRIST_KEYS[team + rank][square]
+
+    def __str__(self):
+        """
+        Build a string representation of the chessboard, in the same format as ChessBoard.
+        """
+        rep = ""
+        for row in range(self._dim):
+            for col in range(self._dim):
+                code = self._mailbox[row * self._dim + col]
+                if code == EMPTY:
+                    rep += STRMAP[EMPTY]
+                else:
+                    rep += STRMAP[code - code % 10] + STRMAP[code % 10]
+                if col == self._dim - 1:
+                    rep += "\n"
+                else:
+                    rep += " | "
+            if row != self._dim - 1:
+                rep += "-" * (6 * self._dim - 3)
+                rep += "\n"
+        return rep
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return self._dim
+
+    def get_hash(self):
+        """
+        Return the zobrist hash of the piece placement, the same hash ChessBoard gives for the same position
+        """
+        return self._hash
+
+    def get_codes(self):
+        """
+        Return a flat list of 64 square codes, row by row, holding team + rank for a piece or EMPTY for an empty square
+        """
+        return self._mailbox[:]
+
+    def get_square(self, row, col):
+        """
+        Returns either EMPTY, or the shared PIECES flyweight for the piece at position (row, col) of the board.
+        """
+        code = self._mailbox[row * self._dim + col]
+        if code == EMPTY:
+            return EMPTY
+        return PIECES[code]
+
+    def get_score(self):
+        """
+        Return the current game score of the board
+        """
+        score = 0
+        for rank in range(PAWN, KING + 1):
+            score += PIECE_VALUES[rank] * (self._bb[WHITE][rank].bit_count() - self._bb[BLACK][rank].bit_count())
+        return score
+
+    def _targets(self, square, team, occupied, own, enemy):
+        """
+        Return the bitboard of pseudo legal target squares for the piece on the given square.
+        """
+        rank = self._mailbox[square] % 10
+        if rank == PAWN:
+            # like the Pawn class, a double move only needs its target square to be empty
+            return (PAWN_PUSHES[team][square] & ~occupied) | (PAWN_ATTACKS[team][square] & enemy)
+        elif rank == KNIGHT:
+            return KNIGHT_ATTACKS[square] & ~own
+        elif rank == BISHOP:
+            return slide_attacks(square, occupied, BISHOP_RAYS) & ~own
+        elif rank == ROOK:
+            return slide_attacks(square, occupied, ROOK_RAYS) & ~own
+        elif rank == QUEEN:
+            return slide_attacks(square, occupied, QUEEN_RAYS) & ~own
+        else:
+            return KING_ATTACKS[square] & ~own
+
+    def _attacked(self, square, by_team, occupied, keep = -1):
+        """
+        Check if the given square is attacked by any piece of by_team, given the board occupancy. Only attackers inside the keep mask count, which lets a move be tested without applying it.
+        """
+        pieces = self._bb[by_team]
+        if KNIGHT_ATTACKS[square] & pieces[KNIGHT] & keep:
+            return True
+        # an enemy pawn attacks our square if a pawn of ours on that square would attack it
+        if PAWN_ATTACKS[other_team(by_team)][square] & pieces[PAWN] & keep:
+            return True
+        if KING_ATTACKS[square] & pieces[KING] & keep:
+            return True
+        diagonal = (pieces[BISHOP] | pieces[QUEEN]) & keep
+        if diagonal and slide_attacks(square, occupied, BISHOP_RAYS) & diagonal:
+            return True
+        straight = (pieces[ROOK] | pieces[QUEEN]) & keep
+        if straight and slide_attacks(square, occupied, ROOK_RAYS) & straight:
+            return True
+        return False
+
+    def _is_safe(self, team, org, end):
+        """
+        Check if moving the piece on square org to square end leaves the teams king out of check, without applying the move.
+        """
+        own = self._bb[team]
+        enemy_team = other_team(team)
+        org_bit = 1 << org
+        end_bit = 1 << end
+        king = own[KING]
+        if king & org_bit:
+            king = end_bit
+        if not king:
+            return True
+        occupied = ((own[0] | self._bb[enemy_team][0]) ^ org_bit) | end_bit
+        # a captured enemy piece on the end square can no longer attack
+        return not self._attacked(king.bit_length() - 1, enemy_team, occupied, ~end_bit)
+
+    def _legal_targets(self, square, team):
+        """
+        Return a list of legal target squares for the piece on the given square.
+        """
+        own = self._bb[team][0]
+        enemy = self._bb[other_team(team)][0]
+        targets = self._targets(square, team, own | enemy, own, enemy)
+        legal = []
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            if self._is_safe(team, square, end):
+                legal.append(end)
+        return legal
+
+    def get_legal_moves(self, org_tile):
+        """
+        Return a set of all legal moves for a piece at a given tile
+        """
+        square = org_tile[0] * self._dim + org_tile[1]
+        code = self._mailbox[square]
+        return set(TILES[end] for end in self._legal_targets(square, code - code % 10))
+
+    def get_all_moves(self, team):
+        """
+        given a team, returns all possible moves that team could make
+        """
+        moves = []
+        pieces = self._bb[team][0]
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            org = bit.bit_length() - 1
+            for end in self._legal_targets(org, team):
+                moves.append((TILES[org], TILES[end]))
+        return moves
+
+    def get_pseudo_moves(self, team):
+        """
+        given a team, returns all the moves that team's pieces can make without checking whether they leave its king in check, a caller can test a move with apply_move, is_check and unmake_move
+        """
+        moves = []
+        own = self._bb[team][0]
+        enemy = self._bb[other_team(team)][0]
+        pieces = own
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            org = bit.bit_length() - 1
+            targets = self._targets(org, team, own | enemy, own, enemy)
+            while targets:
+                end = targets & -targets
+                targets ^= end
+                moves.append((TILES[org], TILES[end.bit_length() - 1]))
+        return moves
+
+    def apply_move(self, org_tile, end_tile):
+        """
+        Given a coordinate for a piece, and a target coordinate, move the piece from the initial to target coordinate on the board.
+        """
+        org = org_tile[0] * self._dim + org_tile[1]
+        end = end_tile[0] * self._dim + end_tile[1]
+        code = self._mailbox[org]
+        team = code - code % 10
+        string = (f"MOVE: {STRMAP[team]}{STRMAP[code % 10]} {str(org_tile)} --> {str(end_tile)}")
+
+        # if the target square holds an enemy piece, remove it from the enemy bitboards
+        captured = self._mailbox[end]
+        if captured != EMPTY:
+            enemy = self._bb[captured - captured % 10]
+            enemy[captured % 10] ^= 1 << end
+            enemy[0] ^= 1 << end
+            self._hash ^= ZOBRIST_KEYS[captured][end]
+
+        own = self._bb[team]
+        move_bits = (1 << org) | (1 << end)
+        own[code % 10] ^= move_bits
+        own[0] ^= move_bits
+        self._mailbox[end] = code
+        self._mailbox[org] = EMPTY
+        self._hash ^= ZOBRIST_KEYS[code][org] ^ ZOBRIST_KEYS[code][end]
+        self._history.append((org, end, captured))
+        return string
+
+    def unmake_move(self):
+        """
+        Revert the last move made with apply_move.
+        """
+        org, end, captured = self._history.pop()
+        code = self._mailbox[end]
+        own = self._bb[code - code % 10]
+        move_bits = (1 << org) | (1 << end)
+        own[code % 10] ^= move_bits
+        own[0] ^= move_bits
+        self._mailbox[org] = code
+        self._mailbox[end] = captured
+        self._hash ^= ZOBRIST_KEYS[code][org] ^ ZOBRIST_KEYS[code][end]
+
+        if captured != EMPTY:
+            enemy = self._bb[captured - captured % 10]
+            enemy[captured % 10] ^= 1 << end
+            enemy[0] ^= 1 << end
+            self._hash ^= ZOBRIST_KEYS[captured][end]
+
+    def is_attacked(self, tile, by_team):
+        """
+        check if the given tile is attacked by any piece of by_team, returning either True or False
+        """
+        occupied = self._bb[WHITE][0] | self._bb[BLACK][0]
+        return self._attacked(tile[0] * self._dim + tile[1], by_team, occupied)
+
+    def is_check(self, team):
+        """
+        check if the given team is in check, returning either True or False
+        """
+        king = self._bb[team][KING]
+        if not king:
+            return False
+        occupied = self._bb[WHITE][0] | self._bb[BLACK][0]
+        return self._attacked(king.bit_length() - 1, other_team(team), occupied)
+
+    def is_stale(self, team):
+        """
+        check if the given team is stale, meaning if they can make no moves without putting themselves in check, returning either True or False
+        """
+        own = self._bb[team][0]
+        enemy = self._bb[other_team(team)][0]
+        pieces = own
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            org = bit.bit_length() - 1
+            targets = self._targets(org, team, own | enemy, own, enemy)
+            # stop at the first target that is safe, rather than testing them all
+            while targets:
+                end = targets & -targets
+                targets ^= end
+                if self._is_safe(team, org, end.bit_length() - 1):
+                    return False
+        return True
+
+    def check_win(self, mc = False):
+        """
+        check the current win state of the board, 
+            returns False if game is undecided, 
+            returns WHITE if white team has won,
+            returns BLACK if black team has won,
+            returns DRAW if there is a stalemate
+        """
+        return cached_winner(self)
+
+    def clone(self):
+        """
+        Return a copy of the board.
+        """
+        return BitBoard(self)
+
+class MailboxBoard:
+    """
+    Compact chessboard holding its whole position in one flat bytearray of 64 square codes (team + rank, or EMPTY). Pieces are the shared PIECES flyweights rather than objects per board, and a pawn is unmoved exactly when it stands on its starting row, so there is no per piece state and cloning is a single buffer copy. It exposes the same search surface as ChessBoard and BitBoard, generating moves from the precomputed square tables at the bottom of this module.
+    """
+    __slots__ = ('_squares', '_score', '_hash', '_history')
+
+    def __init__(self, board = None):
+        """
+        Initialize the board with the starting position, or copy the position of a given ChessBoard, BitBoard or MailboxBoard.
+        """
+        # stack of (org, end, captured code) undo records for unmake_move
+        self._history = []
+
+        if isinstance(board, MailboxBoard):
+            self._squares = board._squares[:]
+            self._score = board._score
+            self._hash = board._hash
+            return
+
+        if board == None:
+            codes = ([BLACK + rank for rank in FRONT_ROW] + [BLACK + PAWN] * 8 + [EMPTY] * 32
+                     + [WHITE + PAWN] * 8 + [WHITE + rank for rank in FRONT_ROW])
+        else:
+            codes = board.get_codes()
+        self._squares = bytearray(codes)
+        self._score = 0
+        self._hash = 0
+        for square, code in enumerate(codes):
+            if code != EMPTY:
+                self._score += CODE_VALUES[code]
+                self._hash ^= ZOBRIST_KEYS[code][square]
+
+    def __str__(self):
+        """
+        Build a string representation of the chessboard, in the same format as ChessBoard.
+        """
+        rep = ""
+        for row in range(8):
+            for col in range(8):
+                code = self._squares[row * 8 + col]
+                if code == EMPTY:
+                    rep += STRMAP[EMPTY]
+                else:
+                    rep += str(PIECES[code])
+                if col == 7:
+                    rep += "\n"
+                else:
+                    rep += " | "
+            if row != 7:
+                rep += "-" * (6 * 8 - 3)
+                rep += "\n"
+        return rep
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return 8
+
+    def get_square(self, row, col):
+        """
+        Returns either EMPTY, or the shared PIECES flyweight for the piece at position (row, col) of the board.
+        """
+        code = self._squares[row * 8 + col]
+        if code == EMPTY:
+            return EMPTY
+        return PIECES[code]
+
+    def get_codes(self):
+        """
+        Return a flat list of 64 square codes, row by row, holding team + rank for a piece or EMPTY for an empty square
+        """
+        return list(self._squares)
+
+    def get_hash(self):
+        """
+        Return the zobrist hash of the piece placement, the same hash the other board classes give for the same position
+        """
+        return self._hash
+
+    def get_score(self):
+        """
+        Return the current game score of the board
+        """
+        return self._score
+
+    def _targets(self, square, team):
+        """
+        Return a list of the pseudo legal target squares of the piece on the given square.
+        """
+        squares = self._squares
+        rank = squares[square] % 10
+        targets = []
+        if rank == PAWN:
+            # like the Pawn class, a double move only needs its target square to be empty
+            for end in PAWN_PUSH_SQUARES[team][square]:
+                if squares[end] == EMPTY:
+                    targets.append(end)
+            for end in PAWN_CAPTURE_SQUARES[team][square]:
+                if squares[end] != EMPTY and squares[end] - squares[end] % 10 != team:
+                    targets.append(end)
+        elif rank == KNIGHT or rank == KING:
+            for end in (KNIGHT_SQUARES[square] if rank == KNIGHT else KING_SQUARES[square]):
+                if squares[end] == EMPTY or squares[end] - squares[end] % 10 != team:
+                    targets.append(end)
+        else:
+            if rank == ROOK:
+                rays = STRAIGHT_RAY_SQUARES[square]
+            elif rank == BISHOP:
+                rays = DIAGONAL_RAY_SQUARES[square]
+            else:
+                rays = STRAIGHT_RAY_SQUARES[square] + DIAGONAL_RAY_SQUARES[square]
+            for ray in rays:
+                for end in ray:
+                    if squares[end] == EMPTY:
+                        targets.append(end)
+                    else:
+                        if squares[end] - squares[end] % 10 != team:
+                            targets.append(end)
+                        break
+        return targets
+
+    def _attacked(self, square, by_team):
+        """
+        Check if the given square is attacked by any piece of by_team, probing outwards from the square and stopping at the first attacker found
+        """
+        squares = self._squares
+        for rays, slider in ((STRAIGHT_RAY_SQUARES[square], by_team + ROOK), (DIAGONAL_RAY_SQUARES[square], by_team + BISHOP)):
+            for ray in rays:
+                for end in ray:
+                    if squares[end] != EMPTY:
+                        if squares[end] == slider or squares[end] == by_team + QUEEN:
+                            return True
+                        break
+        for end in KNIGHT_SQUARES[square]:
+            if squares[end] == by_team + KNIGHT:
+                return True
+        for end in KING_SQUARES[square]:
+            if squares[end] == by_team + KING:
+                return True
+        # an enemy pawn attacks our square if a pawn of ours on that square would attack it
+        for end in PAWN_CAPTURE_SQUARES[other_team(by_team)][square]:
+            if squares[end] == by_team + PAWN:
+                return True
+        return False
+
+    def _is_safe(self, team, org, end):
+        """
+        Check if moving the piece on square org to square end leaves the teams king out of check, by trying the move on the buffer and taking it back
+        """
+        squares = self._squares
+        moved = squares[org]
+        captured = squares[end]
+        squares[end] = moved
+        squares[org] = EMPTY
+        king = squares.find(team + KING)
+        safe = king == -1 or not self._attacked(king, other_team(team))
+        squares[org] = moved
+        squares[end] = captured
+        return safe
+
+    def _legal_targets(self, square, team):
+        """
+        Return a list of legal target squares for the piece on the given square.
+        """
+        return [end for end in self._targets(square, team) if self._is_safe(team, square, end)]
+
+    def get_legal_moves(self, org_tile):
+        """
+        Return a set of all legal moves for a piece at a given tile
+        """
+        square = org_tile[0] * 8 + org_tile[1]
+        code = self._squares[square]
+        return set(TILES[end] for end in self._legal_targets(square, code - code % 10))
+
+    def get_all_moves(self, team):
+        """
+        given a team, returns all possible moves that team could make
+        """
+        moves = []
+        squares = self._squares
+        for org in range(64):
+            if squares[org] != EMPTY and squares[org] - squares[org] % 10 == team:
+                for end in self._legal_targets(org, team):
+                    moves.append((TILES[org], TILES[end]))
+        return moves
+
+    def get_pseudo_moves(self, team):
+        """
+        given a team, returns all the moves that team's pieces can make without checking whether they leave its king in check, a caller can test a move with apply_move, is_check and unmake_move
+        """
+        moves = []
+        squares = self._squares
+        for org in range(64):
+            if squares[org] != EMPTY and squares[org] - squares[org] % 10 == team:
+                for end in self._targets(org, team):
+                    moves.append((TILES[org], TILES[end]))
+        return moves
+
+    def apply_move(self, org_tile, end_tile):
+        """
+        Given a coordinate for a piece, and a target coordinate, move the piece from the initial to target coordinate on the board.
+        """
+        org = org_tile[0] * 8 + org_tile[1]
+        end = end_tile[0] * 8 + end_tile[1]
+        code = self._squares[org]
+        string = (f"MOVE: {PIECES[code]} {str(org_tile)} --> {str(end_tile)}")
+
+        captured = self._squares[end]
+        if captured != EMPTY:
+            self._score -= CODE_VALUES[captured]
+            self._hash ^= ZOBRIST_KEYS[captured][end]
+        self._squares[end] = code
+        self._squares[org] = EMPTY
+        self._hash ^= ZOBRIST_KEYS[code][org] ^ ZOBRIST_KEYS[code][end]
+        self._history.append((org, end, captured))
+        return string
+
+    def unmake_move(self):
+        """
+        Revert the last move made with apply_move.
+        """
+        org, end, captured = self._history.pop()
+        code = self._squares[end]
+        self._squares[org] = code
+        self._squares[end] = captured
+        self._hash ^= ZOBRIST_KEYS[code][org] ^ ZOBRIST_KEYS[code][end]
+        if captured != EMPTY:
+            self._score += CODE_VALUES[captured]
+            self._hash ^= ZOBRIST_KEYS[captured][end]
+
+    def is_attacked(self, tile, by_team):
+        """
+        check if the given tile is attacked by any piece of by_team, returning either True or False
+        """
+        return self._attacked(tile[0] * 8 + tile[1], by_team)
+
+    def is_check(self, team):
+        """
+        check if the given team is in check, returning either True or False
+        """
+        king = self._squares.find(team + KING)
+        if king == -1:
+            return False
+        return self._attacked(king, other_team(team))
+
+    def is_stale(self, team):
+        """
+        check if the given team is stale, meaning if they can make no moves without putting themselves in check, returning either True or False
+        """
+        squares = self._squares
+        for org in range(64):
+            if squares[org] != EMPTY and squares[org] - squares[org] % 10 == team:
+                # stop at the first target that is safe, rather than testing them all
+                for end in self._targets(org, team):
+                    if self._is_safe(team, org, end):
+                        return False
+        return True
+
+    def check_win(self, mc = False):
+        """
+        check the current win state of the board, 
+            returns False if game is undecided, 
+            returns WHITE if white team has won,
+            returns BLACK if black team has won,
+            returns DRAW if there is a stalemate
+        """
+        return cached_winner(self)
+
+    def clone(self):
+        """
+        Return a copy of the board.
+        """
+        return MailboxBoard(self)
+
 class GameMaster:
     """
     Class for the game master, which deals with setting the state of the game, this could also be in the GUI, but I like the separation, and I believe it allows for more reusability of the GUI code
@@ -626,22 +1520,49 @@ class GameMaster:
         self._state = self.OVER
 
 
-def traverse_grid(start_cell, direction, num_steps, board):
+def slide_moves(board, position, ray_tiles, team):
     """
-    Iterates through the cells in a grid in a given linear direction (2D vector), until another ChessPiece is encountered, returns list all traversed tiles
+    Given a ChessBoard, a position, a table of ray tiles and the team of the moving piece, walk each ray from the position until another ChessPiece is encountered, and return a list of the tiles the piece can move to, including a capture of the blocking piece if it is an enemy
     """
-    tiles = []
-    for step in range(1, num_steps + 1):
-        row = start_cell[0] + step * direction[0]
-        col = start_cell[1] + step * direction[1]
-        if (row < 0) or (row > 7) or (col < 0) or (col > 7):
-            return tiles 
-        elif board._board[row][col] != EMPTY:
-            tiles.append((row, col))
-            return tiles
-        tiles.append((row, col))
-    return tiles
+    p_moves = []
+    for ray in ray_tiles[position[0]][position[1]]:
+        for tile in ray:
+            target = board._board[tile[0]][tile[1]]
+            if target == EMPTY:
+                p_moves.append(tile)
+            else:
+                if target.get_team() != team:
+                    p_moves.append(tile)
+                break
+    return p_moves
                        
+def find_winner(board):
+    """
+    given a board, work out its win state without the cache of check_win, returning False if the game is undecided, the winning team, or DRAW for a stalemate
+    """
+    if board.is_stale(WHITE):
+        if board.is_check(WHITE):
+            return BLACK
+        else:
+            return DRAW
+    elif board.is_stale(BLACK):
+        if board.is_check(BLACK):
+            return WHITE
+        else:
+            return DRAW
+    else:
+        return False
+
+def cached_winner(board):
+    """
+    given a board, return its win state like find_winner, looked up in TERMINAL_CACHE under the boards zobrist hash, as the result only depends on the piece placement
+    """
+    winner = TERMINAL_CACHE.get(board.get_hash())
+    if winner == None:
+        winner = find_winner(board)
+        TERMINAL_CACHE.put(board.get_hash(), winner)
+    return winner
+
 def other_team(team):
     """
     given a team, returns the other team
@@ -651,3 +1572,141 @@ def other_team(team):
     else:
         return WHITE
 
+
+def build_step_table(vectors):
+    """
+    Given a list of (row, col) step vectors, return a list with a bitboard of the on-board target squares for each of the 64 squares
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            for direc in vectors:
+                if (0 <= row + direc[0] <= 7) and (0 <= col + direc[1] <= 7):
+                    mask |= 1 << ((row + direc[0]) * 8 + col + direc[1])
+            table.append(mask)
+    return table
+
+def build_ray_table(direction):
+    """
+    Given a (row, col) direction, return a list with a bitboard of every square along that ray, up to the board edge, for each of the 64 squares
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            step_row, step_col = row + direction[0], col + direction[1]
+            while (0 <= step_row <= 7) and (0 <= step_col <= 7):
+                mask |= 1 << (step_row * 8 + step_col)
+                step_row += direction[0]
+                step_col += direction[1]
+            table.append(mask)
+    return table
+
+def build_pawn_pushes(team):
+    """
+    Given a team, return a list with a bitboard of the forward moves of a pawn of that team for each of the 64 squares, including the double move from the starting row
+    """
+    table = build_step_table([(TEAM_SIDE[team], 0)])
+    for col in range(8):
+        square = PAWN_START_ROW[team] * 8 + col
+        table[square] |= 1 << (square + TEAM_SIDE[team] * 16)
+    return table
+
+def build_square_table(vectors, num_steps):
+    """
+    Given a list of (row, col) step vectors and a number of steps, return a list with, for each of the 64 squares, a list per vector of the on-board squares reached stepping along it, nearest first
+    """
+    table = []
+    for row in range(8):
+        for col in range(8):
+            rays = []
+            for direc in vectors:
+                ray = []
+                for step in range(1, num_steps + 1):
+                    if (0 <= row + step * direc[0] <= 7) and (0 <= col + step * direc[1] <= 7):
+                        ray.append((row + step * direc[0]) * 8 + col + step * direc[1])
+                rays.append(ray)
+            table.append(rays)
+    return table
+
+def build_pawn_push_squares(team):
+    """
+    Given a team, return a list with the forward move squares of a pawn of that team for each of the 64 squares, including the double move from the starting row
+    """
+    table = [[square for ray in rays for square in ray] for rays in build_square_table([(TEAM_SIDE[team], 0)], 1)]
+    for col in range(8):
+        table[PAWN_START_ROW[team] * 8 + col].append((PAWN_START_ROW[team] + TEAM_SIDE[team] * 2) * 8 + col)
+    return table
+
+def build_tile_table(table):
+    """
+    Given a per square table of square lists (or of lists of square lists), return the same table indexed by [row][col] instead, holding (row, col) tiles in place of squares
+    """
+    def to_tiles(entry):
+        return [to_tiles(item) if isinstance(item, list) else TILES[item] for item in entry]
+    return [[to_tiles(table[row * 8 + col]) for col in range(8)] for row in range(8)]
+
+def slide_attacks(square, occupied, rays):
+    """
+    Return the bitboard of squares a sliding piece on the given square reaches along the given rays, stopping on (and including) the first occupied square of each ray
+    """
+    attacks = 0
+    for ray in rays:
+        mask = RAY_MASKS[ray][square]
+        blockers = mask & occupied
+        if blockers:
+            # rays below 4 step towards higher squares, so their first blocker is the lowest set bit, otherwise the highest
+            if ray < 4:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            mask ^= RAY_MASKS[ray][first]
+        attacks |= mask
+    return attacks
+
+
+# Precomputed tables for the BitBoard engine, square (row, col) is indexed as row * 8 + col
+TILES = [(square // 8, square % 8) for square in range(64)]
+KNIGHT_ATTACKS = build_step_table(KNIGHT_VECTORS)
+KING_ATTACKS = build_step_table(STRAIGHT_VECTORS + DIAGONAL_VECTORS)
+PAWN_ATTACKS = {team: build_step_table([(TEAM_SIDE[team], 1), (TEAM_SIDE[team], -1)]) for team in (WHITE, BLACK)}
+PAWN_PUSHES = {team: build_pawn_pushes(team) for team in (WHITE, BLACK)}
+# the first four rays step towards higher square indexes, the last four towards lower ones
+RAY_VECTORS = [(0, 1), (1, -1), (1, 0), (1, 1), (0, -1), (-1, 1), (-1, 0), (-1, -1)]
+RAY_MASKS = [build_ray_table(direc) for direc in RAY_VECTORS]
+ROOK_RAYS = [0, 2, 4, 6]
+BISHOP_RAYS = [1, 3, 5, 7]
+QUEEN_RAYS = [0, 1, 2, 3, 4, 5, 6, 7]
+
+# Precomputed square tables for the MailboxBoard engine, one list of target squares per square (per ray for the sliding pieces, nearest first)
+KNIGHT_SQUARES = [[square for ray in rays for square in ray] for rays in build_square_table(KNIGHT_VECTORS, 1)]
+KING_SQUARES = [[square for ray in rays for square in ray] for rays in build_square_table(STRAIGHT_VECTORS + DIAGONAL_VECTORS, 1)]
+PAWN_PUSH_SQUARES = {team: build_pawn_push_squares(team) for team in (WHITE, BLACK)}
+PAWN_CAPTURE_SQUARES = {team: [[square for ray in rays for square in ray] for rays in build_square_table([(TEAM_SIDE[team], 1), (TEAM_SIDE[team], -1)], 1)] for team in (WHITE, BLACK)}
+STRAIGHT_RAY_SQUARES = [[ray for ray in rays if ray] for rays in build_square_table(STRAIGHT_VECTORS, 7)]
+DIAGONAL_RAY_SQUARES = [[ray for ray in rays if ray] for rays in build_square_table(DIAGONAL_VECTORS, 7)]
+
+# The same tables indexed by [row][col] and holding (row, col) tiles, for the piece classes of ChessBoard. The pawn double move table holds the double step from every square, ChessBoard pawns only use it while they are unmoved
+KNIGHT_TILES = build_tile_table(KNIGHT_SQUARES)
+KING_TILES = build_tile_table(KING_SQUARES)
+PAWN_STEP_TILES = {team: build_tile_table([[square for ray in rays for square in ray] for rays in build_square_table([(TEAM_SIDE[team], 0)], 1)]) for team in (WHITE, BLACK)}
+PAWN_DOUBLE_TILES = {team: build_tile_table([[square for ray in rays for square in ray] for rays in build_square_table([(TEAM_SIDE[team] * 2, 0)], 1)]) for team in (WHITE, BLACK)}
+PAWN_CAPTURE_TILES = {team: build_tile_table(PAWN_CAPTURE_SQUARES[team]) for team in (WHITE, BLACK)}
+STRAIGHT_RAY_TILES = build_tile_table(STRAIGHT_RAY_SQUARES)
+DIAGONAL_RAY_TILES = build_tile_table(DIAGONAL_RAY_SQUARES)
+
+# Shared, immutable flyweight piece for every piece code (team + rank), used by the boards that store codes rather than piece objects
+PIECE_CLASSES = {PAWN: Pawn, ROOK: Rook, KNIGHT: Knight, BISHOP: Bishop, QUEEN: Queen, KING: King}
+SHARED_PIECE_CLASSES = {rank: type("Shared" + PIECE_CLASSES[rank].__name__, (SharedPiece, PIECE_CLASSES[rank]), {"__slots__": ()}) for rank in PIECE_CLASSES}
+PIECES = {team + rank: shared_piece(PIECE_CLASSES[rank](team)) for team in (WHITE, BLACK) for rank in PIECE_CLASSES}
+
+# Win state of recently checked positions, keyed by zobrist hash and shared by every board class, as the same placement has the same hash in each
+TERMINAL_CACHE_SIZE = 100000
+TERMINAL_CACHE = LRUCache(TERMINAL_CACHE_SIZE)
+
+# Zobrist keys, one random 64 bit number per piece and square, indexed by piece code (team + rank) then square. A fixed seed keeps hashes the same across processes and runs
+_zobrist_random = random.Random(2023)
+ZOBRIST_KEYS = {team + rank: [_zobrist_random.getrandbits(64) for square in range(64)] for team in (WHITE, BLACK) for rank in range(PAWN, KING + 1)}
+# Zobrist key xored into a position hash when BLACK is to move, for tables keyed on the position and the team to move together
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
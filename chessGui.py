@@ -1,3 +1,6 @@
+import inspect
+import threading
+import traceback
 import SimpleGUICS2Pygame.simpleguics2pygame as simplegui
 import chessClass as chessgame
 
@@ -10,7 +13,7 @@ class ChessGUI:
     GUI class for chess game itself
     """
     
-    def __init__(self, size, aifunction=None, depth=None, trials=None):
+    def __init__(self, size, aifunction=None, depth=None, trials=None, book=None):
         # Game board
         self._size = size
         self._bar_spacing = GUI_WIDTH // self._size
@@ -55,7 +58,12 @@ class ChessGUI:
         self._aifunction = aifunction
         self._trials = trials
         self._depth = depth
-        self._ai_go = False
+        # opening book (an openingBook.OpeningBook) the AI turn plays from before starting a search, None to always search
+        self._book = book
+        # the running AI search, a dictionary shared with its background thread, None while no search is running
+        self._search = None
+        # the last cancelled search, no new search starts until it has finished, so an AI function that ignores the stop event does not run alongside the next one
+        self._cancelled = None
         
         self.setup_frame()
 
@@ -90,13 +98,47 @@ class ChessGUI:
 
     def newgame(self):
         """
-        Start new game.
+        Start new game, cancelling the AI search if one is running.
         """
+        self.cancel_search()
         self._board = chessgame.ChessBoard()
         self._game = chessgame.GameMaster()
         self._label.set_text("")
         self.picked_up = []
-        self._ai_go = False
+
+    def start_search(self):
+        """
+        Start the AI search for the team to move on a background thread, so the draw handler keeps running while it thinks. The AI function is called like monte_carlo on a clone of the board, with a stop event and a progress function if it accepts them, and the search reports its progress, result or error through the self._search dictionary, which draw polls
+        """
+        search = {"stop": threading.Event(), "progress": None, "move": None, "error": None, "done": False}
+        board = self._board.clone()
+        team = self._game.get_turn()
+
+        def progress(done, total, best):
+            search["progress"] = (done, total, best)
+
+        kwargs = {name: value for name, value in (("stop", search["stop"]), ("progress", progress)) if accepts_keyword(self._aifunction, name)}
+
+        def run():
+            try:
+                search["move"] = self._aifunction(board, team, self._depth, self._trials, **kwargs)
+            except Exception as error:
+                traceback.print_exc()
+                search["error"] = error
+            finally:
+                search["done"] = True
+
+        self._search = search
+        threading.Thread(target=run, daemon=True).start()
+
+    def cancel_search(self):
+        """
+        Stop the running AI search, if any, its result is never used. It is kept as the cancelled search until it has finished
+        """
+        if self._search != None:
+            self._search["stop"].set()
+            self._cancelled = self._search
+            self._search = None
                
     def draw(self, canvas):
         """
@@ -131,18 +173,51 @@ class ChessGUI:
                     (coords[0] - (self._bar_spacing // 2), coords[1] + (self._bar_spacing // 2) )
                     ], 5, "#65fa9120")
 
-        # if we are in an AI game state, sets an ai flag to True, on the next call, since the flag is True, we will then use the AI to simulate the best move, and then set the AI flag to False, and change the turn back to the player, and set the state back to CHOOSE
+        # if we are in an AI game state, play the book move if the opening book has one, otherwise start the AI search in the background, once any cancelled search has finished, then on each call show its progress until it is done and make its move
         if self._game.get_state() == self._game.AI:
-            if self._ai_go:
-                print ("Calulating Optimal Move...")
-                ai_move = self._aifunction(self._board, self._game.get_turn(), self._depth, self._trials)
-                print ("AI Move:")
-                print (self._board.apply_move(ai_move[0], ai_move[1]))
-                self._game.change_turn()
-                self._game.state_choose()
-                self._ai_go = False
-            else:
-                self._ai_go = True
+            if self._search == None and self._cancelled != None and not self._cancelled["done"]:
+                self._label.set_text("Waiting for the cancelled AI search to stop")
+            elif self._search == None:
+                self._cancelled = None
+                book_move = self._book.choose(self._board, self._game.get_turn()) if self._book != None else None
+                if book_move != None:
+                    print ("Book Move:")
+                    self.ai_move(book_move)
+                else:
+                    print ("Calulating Optimal Move...")
+                    self.start_search()
+            elif self._search["done"] and self._search["error"] != None:
+                error = self._search["error"]
+                self._search = None
+                print ("AI search failed, see the traceback above")
+                self._label.set_text(f"AI search failed: {type(error).__name__}: {error}")
+                self._game.state_over()
+            elif self._search["done"]:
+                ai_move = self._search["move"]
+                self._search = None
+                self.ai_move(ai_move)
+            elif self._search["progress"] != None:
+                done, total, best = self._search["progress"]
+                # a timed search has no total number of rollouts
+                count = f"{done}/{total}" if total != None else f"{done}"
+                self._label.set_text(f"AI thinking: {count} rollouts, best so far {best[0]} --> {best[1]}")
+
+    def ai_move(self, ai_move):
+        """
+        Make the move chosen by the AI, then change the turn back to the player and the state back to CHOOSE, or end the game
+        """
+        if ai_move == None:
+            print ("AI could not find a move")
+            self._game.state_over()
+            return
+        print ("AI Move:")
+        print (self._board.apply_move(ai_move[0], ai_move[1]))
+        self._label.set_text(f"AI Move: {ai_move[0]} --> {ai_move[1]}")
+        self._game.change_turn()
+        self._game.state_choose()
+        winner = self._board.check_win()
+        if winner:
+            self.game_over(winner)
 
     def click(self, position):
         """
@@ -241,11 +316,23 @@ class ChessGUI:
         return (posy // self._bar_spacing,
                 posx // self._bar_spacing)
 
-def run_gui(board_size=8, ai_function=None, depth=None, trials=None):
+def accepts_keyword(function, name):
+    """
+    Return True if the function can be called with the named keyword argument, either as a parameter of that name or through **kwargs
+    """
+    try:
+        parameters = inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return False
+    if name in parameters and parameters[name].kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY):
+        return True
+    return any(parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters.values())
+
+def run_gui(board_size=8, ai_function=None, depth=None, trials=None, book=None):
     """
-    Make a GUI object and run the game!
+    Make a GUI object and run the game! Given an opening book, the AI plays its book moves without searching
     """
-    gui = ChessGUI(board_size, ai_function, depth, trials)
+    gui = ChessGUI(board_size, ai_function, depth, trials, book)
     gui.start()
 
 # run_gui = ChessGUI()
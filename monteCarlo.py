@@ -2,67 +2,491 @@
 Monte Carlo chess module, plays a chess game with random move generation to find "optimal" moves
 """
 
+import concurrent.futures
+import math
 import random
+import time
 import chessClass as chessgame
-import chessGui as chess_gui
+import rolloutPolicy
+import searchStats
 
 DEPTH = 2
 TRIALS = 10
+# number of worker processes monte_carlo fans its simulations out to, 1 runs everything in this process
+WORKERS = 1
+# wall clock budget in milliseconds for the tree searches, None uses a fixed number of rollouts instead
+MOVETIME_MS = None
+# maximum number of positions kept in the transposition table
+TABLE_SIZE = 100000
+# play the trials of run_sim all at once with the NumPy batch engine in batchRollout, instead of one run_trial at a time
+BATCH = False
+# sample the rollout moves from the pseudo legal moves and only check the sampled move for legality, instead of listing every legal move each ply
+LAZY = False
+# rollout policy of the trials, a function or the name of one in rolloutPolicy.POLICIES, "random" plays uniformly random moves and "capture" favours good captures and keeps the queen out of attack
+POLICY = "random"
+# gamescore given to a trial that ends in a win, positive for a WHITE win and negative for a BLACK win
+WIN_SCORE = 15
+# default rollout budget of halving_search, as a share of the trials per possible move that monte_carlo runs
+HALVING_SHARE = 0.25
+# UCB1 exploration constant for the tree search, applied to average gamescores scaled by WIN_SCORE
+EXPLORATION = 0.5
 
-def monte_carlo(board, team, depth, trials):
+class TranspositionTable(chessgame.LRUCache):
     """
-    given a board state, team, move depth, and number of trials, runs the full monte carlo simulation for that state, and return a tuple representation of the optimal move 
+    Bounded table of rollout statistics keyed by position, so a position reached again (through another move order, or on a later turn) reuses the rollouts already run from it. Once full, the least recently used position is dropped
     """
-    move_list = board.get_all_moves(team)
-    score_tracker = {move: [] for move in move_list}
+    def __init__(self, size=TABLE_SIZE):
+        chessgame.LRUCache.__init__(self, size)
 
-    # apply all possible current moves for the current team, then call run_sim for the resulting board state of each of those moves. Builds a dictionary with keys of each possible move, and values of the average game score
-    for move in score_tracker:
-        clone_board = board.clone()
-        clone_board.apply_move(move[0], move[1])
-        score_tracker[move] = run_sim(clone_board, team, depth, trials)
-    
-    # return the move with either the minimum or maximum gamescore depending on if the current team is BLACK (min) or WHITE (max)
+    def get(self, key):
+        """
+        Return the [rollout count, gamescore total] entry for a key, or None if the key is not in the table
+        """
+        return chessgame.LRUCache.get(self, key)
+
+    def add(self, key, count, total):
+        """
+        Add count rollouts with the given gamescore total to the entry for a key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry == None:
+                self._entries[key] = [count, total]
+                if len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+                entry[0] += count
+                entry[1] += total
+
+# table shared by every monte_carlo call in this process
+TABLE = TranspositionTable()
+
+# persistent worker pool for the parallel searches, created on first use
+_pool = None
+_pool_workers = None
+
+def get_pool(workers):
+    """
+    Return the persistent process pool with the given number of workers, starting it (or restarting it with the new size) if needed
+    """
+    global _pool, _pool_workers
+    if _pool == None or _pool_workers != workers:
+        shutdown_pool()
+        # every worker reseeds its random generator, forked workers would otherwise all replay the same rollouts
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=random.seed)
+        _pool_workers = workers
+    return _pool
+
+def shutdown_pool():
+    """
+    Shut down the persistent process pool, if it is running
+    """
+    global _pool, _pool_workers
+    if _pool != None:
+        _pool.shutdown()
+    _pool = None
+    _pool_workers = None
+
+def monte_carlo(board, team, depth, trials, workers=WORKERS, table=TABLE, batch=BATCH, lazy=LAZY, stats=None, stop=None, progress=None, book=None, policy=POLICY):
+    """
+    given a board state, team, move depth, and number of trials, runs the full monte carlo simulation for that state, and return a tuple representation of the optimal move. With more than one worker, the simulation of each possible move runs in the persistent process pool. Rollouts are recorded in the transposition table, and a position already in the table only runs the trials it is missing, pass table=None to always simulate from scratch. Given a searchStats.SearchStats object as stats, the search is recorded into it. Setting the stop event (a threading.Event) ends the search early with the best of the moves evaluated so far, and a progress function is called with the trials done, the total trials and the best move so far each time a move has been evaluated. Given an openingBook.OpeningBook as book, a position found in it is played from the book without searching. The trials pick their moves with the rollout policy, see rolloutPolicy, except batch trials which are always uniformly random
+    """
+    if stats != None:
+        with stats.recording():
+            return root_search(board, team, depth, trials, workers, table, batch, lazy, stats, stop, progress, book, policy)
+    return root_search(board, team, depth, trials, workers, table, batch, lazy, None, stop, progress, book, policy)
+
+def root_search(board, team, depth, trials, workers, table, batch, lazy, stats=None, stop=None, progress=None, book=None, policy=POLICY):
+    """
+    the search of monte_carlo, timing its phases and counting the trials it runs and reuses into stats if it is not None
+    """
+    if book != None:
+        with searchStats.phase(stats, "book"):
+            move = book.choose(board, team)
+        if move != None:
+            if stats != None:
+                stats.count("book_hits")
+            return move
+
+    with searchStats.phase(stats, "move_generation"):
+        move_list = board.get_all_moves(team)
+    # average gamescore of each move evaluated so far
+    score_tracker = {}
+    keys = {}
+    missing = {}
+
+    def record(move, score):
+        # combine the new trials of a move with the ones already in the table, and report the best move so far
+        if table != None:
+            if missing[move] > 0:
+                table.add(keys[move], missing[move], score * missing[move])
+            entry = table.get(keys[move])
+            score = entry[1] / entry[0]
+        score_tracker[move] = score
+        if progress != None:
+            progress(len(score_tracker) * trials, len(move_list) * trials, best_scored_move(score_tracker, team))
+
+    # apply all possible current moves for the current team, look up how many trials the table already holds for the resulting board state, and start the missing ones, trials of different policies are kept apart in the table as they score positions differently
+    with searchStats.phase(stats, "simulation"):
+        # the trials start from the position after the move, where the other team is to move
+        reply_team = chessgame.other_team(team)
+        # the policy the trials actually play, batch trials are always uniformly random whatever the policy asked for
+        trial_policy = rolloutPolicy.random_policy if batch else rolloutPolicy.get_policy(policy)
+        futures = {}
+        for move in move_list:
+            if stop != None and stop.is_set():
+                break
+            board.apply_move(move[0], move[1])
+            keys[move] = (board.get_hash(), team, depth, trial_policy)
+            entry = table.get(keys[move]) if table != None else None
+            missing[move] = trials - entry[0] if entry != None else trials
+            if missing[move] <= 0:
+                record(move, None)
+            elif workers > 1:
+                futures[get_pool(workers).submit(run_sim, board.clone(), reply_team, depth, missing[move], batch, lazy, policy)] = move
+            else:
+                record(move, run_sim(board, reply_team, depth, missing[move], batch, lazy, policy))
+            board.unmake_move()
+        for future in concurrent.futures.as_completed(futures):
+            if stop != None and stop.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+            record(futures[future], future.result())
+
+    if stats != None:
+        stats.count("root_moves", len(move_list))
+        stats.count("trials_run", sum(max(missing[move], 0) for move in score_tracker))
+        stats.count("trials_reused", sum(trials - max(missing[move], 0) for move in score_tracker))
+
+    with searchStats.phase(stats, "selection"):
+        # a search stopped before any move was evaluated falls back to the first move
+        if not score_tracker:
+            return move_list[0] if move_list else None
+        return best_scored_move(score_tracker, team)
+
+def best_scored_move(score_tracker, team):
+    """
+    Given a dictionary of move -> average gamescore, return the move with either the minimum or maximum gamescore depending on if the team is BLACK (min) or WHITE (max)
+    """
     if team == chessgame.BLACK:
         return min(score_tracker, key = lambda k: score_tracker[k])
     else:
         return max(score_tracker, key = lambda k: score_tracker[k])
 
-def run_sim(board, team, depth, trials):
+def halving_search(board, team, depth, trials, budget=None, lazy=LAZY, policy=POLICY, stop=None, progress=None):
     """
-    given a board state, team, move depth, and number of trials, runs "trials" number of monte carlo trials and returns an average gamescore as a number
+    given a board state, team, rollout depth, and number of trials, spreads a total of budget rollouts over the possible moves by successive halving and returns a tuple representation of the move with the best average gamescore. The rollouts run in rounds, each round gives every remaining move an equal share of the round's part of the budget, then drops the worse half of the moves by average gamescore, so clearly losing moves stop using rollouts early and the survivors get the rest. The budget defaults to HALVING_SHARE of the trials per possible move that monte_carlo would run, and at least one rollout per move, pass a budget to choose it. The search never runs more than budget rollouts: when the part of the budget left cannot give every remaining move a rollout, the round gives one rollout to as many moves as it can, in random order, and the moves left without one are dropped. Like in monte_carlo, the trials pick their moves with the rollout policy, setting the stop event ends the search early with the best move so far, and a progress function is called with the rollouts done, the total rollouts and the best move so far, here after each move of each round
     """
+    move_list = board.get_all_moves(team)
+    if len(move_list) < 2:
+        return move_list[0] if move_list else None
+    if budget == None:
+        budget = max(len(move_list), math.ceil(trials * len(move_list) * HALVING_SHARE))
+
+    # the trials start from the position after the move, where the other team is to move
+    reply_team = chessgame.other_team(team)
+    # rollouts run and gamescore total of each move
+    totals = {move: [0, 0] for move in move_list}
+    # shuffled so a budget too small for every move does not always leave out the same ones
+    survivors = random.sample(move_list, len(move_list))
+    done = 0
+
+    def averages():
+        return {move: totals[move][1] / totals[move][0] for move in survivors if totals[move][0] > 0}
+
+    while len(survivors) > 1 and done < budget:
+        # split what is left of the budget evenly between the rounds left, and the round's part evenly between its moves, with at least one rollout per move while the budget lasts
+        rounds_left = math.ceil(math.log2(len(survivors)))
+        per_move = max(1, (budget - done) // (rounds_left * len(survivors)))
+        for move in survivors:
+            if done >= budget:
+                break
+            if stop != None and stop.is_set():
+                scores = averages()
+                return best_scored_move(scores, team) if scores else survivors[0]
+            runs = min(per_move, budget - done)
+            board.apply_move(move[0], move[1])
+            for dummy_num in range(runs):
+                totals[move][0] += 1
+                totals[move][1] += run_trial(board, reply_team, depth, lazy, policy)
+            board.unmake_move()
+            done += runs
+            if progress != None:
+                progress(done, budget, best_scored_move(averages(), team))
+
+        # keep the better half of the moves that have rollouts, the highest averages for WHITE and the lowest for BLACK
+        scores = averages()
+        survivors = sorted(scores, key = lambda k: scores[k], reverse = team == chessgame.WHITE)[:math.ceil(len(survivors) / 2)]
+    return survivors[0]
+
+def run_sim(board, team, depth, trials, batch=BATCH, lazy=LAZY, policy=POLICY):
+    """
+    given a board state, team, move depth, and number of trials, runs "trials" number of monte carlo trials and returns an average gamescore as a number. With batch set, the trials are played together by the NumPy engine in batchRollout, with lazy set each trial checks the legality of its sampled moves only, and otherwise the trials pick their moves with the rollout policy
+    """
+    if batch:
+        # imported here so NumPy is only needed when the batch engine is used
+        import batchRollout
+        return float(batchRollout.run_batch(board, team, depth, trials, WIN_SCORE).mean())
+
     results = []
 
-    # call the run_trial function "trials" times, randomly simulating a chessgame, and appending the resulting gamescore to the results list
+    # call the run_trial function "trials" times, randomly simulating a chessgame, and appending the resulting gamescore to the results list, run_trial leaves the board as it found it so no clone is needed
     for dummy_num in range(trials):
-        clone_board = board.clone() 
-        score = run_trial(clone_board, team, depth)
+        score = run_trial(board, team, depth, lazy, policy)
         results.append(score)
 
     # return the average result
     return sum(results) / len(results)
 
-def run_trial(board, team, depth):
+def run_trial(board, team, depth, lazy=LAZY, policy=POLICY):
+    """
+    Given a board, a team, and a move depth, runs a single random trial to the depth, and returns the resulting game score as a number. The trial moves are unmade before returning, so the board is left unchanged. With lazy set, each ply applies a move from play_policy_move, and the game is only tested for a finish when the team to move has no legal move left, rather than with check_win after every move. Each move is picked by the rollout policy, a function or the name of one in rolloutPolicy.POLICIES
+    """
+    return play_trial(board, team, depth, lazy, policy)[0]
+
+def play_trial(board, team, depth, lazy=LAZY, policy=POLICY):
     """
-    Given a board, a team, and a move depth, runs a single random trial to the depth, and returns the resulting game score as a number
+    The trial of run_trial, returning a tuple of the game score and the number of plies played
     """
     starting_team = team
     team = team
+    score = None
+    plies = 0
+    policy = rolloutPolicy.get_policy(policy)
 
-    # make a number of random turns equal to double the depth, to give depth number of rounds, if there is a win during the trial, return a large gamescore
+    # make a number of random turns equal to double the depth, to give depth number of rounds, if there is a win during the trial, score it as a large gamescore for the winner
     for dummy_num in range(depth * 2):
-        move = random.choice(board.get_all_moves(team))
+        if lazy:
+            if play_policy_move(board, team, policy) == None:
+                score = win_score(stuck_result(board, team))
+                break
+            plies += 1
+            team = chessgame.other_team(team)
+            continue
+
+        moves = board.get_all_moves(team)
+        # the trial can start from a finished game, where the team to move has no moves left
+        if not moves:
+            score = win_score(board.check_win())
+            break
+        move = policy(board, team, moves)
         board.apply_move(move[0], move[1])
+        plies += 1
         team = chessgame.other_team(team)
-        if board.check_win():
-            if starting_team == chessgame.WHITE:
-                return 15
-            else:
-                return -15
-            
-    # return the boards gamescore
-    return board.get_score()
+        winner = board.check_win()
+        if winner:
+            score = win_score(winner)
+            break
+
+    # a lazy trial has not yet looked for a finish caused by its last move, so check the team to move has a legal reply
+    if lazy and score == None:
+        if play_random_move(board, team) == None:
+            score = win_score(stuck_result(board, team))
+        else:
+            board.unmake_move()
+
+    # otherwise use the boards gamescore
+    if score == None:
+        score = board.get_score()
+
+    # take back the random moves, newest first
+    for dummy_num in range(plies):
+        board.unmake_move()
+    return (score, plies)
+
+def play_random_move(board, team):
+    """
+    Given a board and a team, apply a uniformly random legal move for the team and return it, or return None if the team has no legal moves. The move is sampled from the pseudo legal moves and only the sampled move is checked, a move that leaves the king in check is unmade and another is drawn
+    """
+    moves = board.get_pseudo_moves(team)
+    while moves:
+        index = random.randrange(len(moves))
+        move = moves[index]
+        # remove the sample by moving the last move into its place, so no move is tried twice
+        moves[index] = moves[-1]
+        moves.pop()
+        board.apply_move(move[0], move[1])
+        if not board.is_check(team):
+            return move
+        board.unmake_move()
+    return None
+
+def play_policy_move(board, team, policy):
+    """
+    Given a board, a team and a rollout policy function, apply the legal move the policy picks from the team's pseudo legal moves and return it, or return None if the team has no legal moves. A picked move that leaves the king in check is unmade and the policy picks again from the moves left, the random policy goes through play_random_move
+    """
+    if policy == rolloutPolicy.random_policy:
+        return play_random_move(board, team)
+    moves = board.get_pseudo_moves(team)
+    while moves:
+        move = policy(board, team, moves)
+        moves.remove(move)
+        board.apply_move(move[0], move[1])
+        if not board.is_check(team):
+            return move
+        board.unmake_move()
+    return None
+
+def stuck_result(board, team):
+    """
+    Given a board where the given team has no legal moves, return the result of the game in the form check_win uses, the other team if the team is in check and DRAW for a stalemate
+    """
+    if board.is_check(team):
+        return chessgame.other_team(team)
+    return chessgame.DRAW
+
+def win_score(winner):
+    """
+    Given the result of check_win, return the gamescore of that result, WIN_SCORE for WHITE, -WIN_SCORE for BLACK and 0 for a stalemate
+    """
+    if winner == chessgame.WHITE:
+        return WIN_SCORE
+    elif winner == chessgame.BLACK:
+        return -WIN_SCORE
+    else:
+        return 0
+
+class TreeNode:
+    """
+    Node of the monte carlo search tree, holding the move that leads to its position, the team to move in that position, and the visit count and gamescore total of the rollouts that passed through it
+    """
+    def __init__(self, move, team, parent=None):
+        self.move = move
+        self.team = team
+        self.parent = parent
+        self.children = []
+        # moves not yet expanded into children, filled the first time the node is reached
+        self.untried = None
+        self.visits = 0
+        self.value = 0
+
+    def select_child(self):
+        """
+        Return the child with the highest UCB1 score, from the point of view of the team to move in this node
+        """
+        sign = 1 if self.team == chessgame.WHITE else -1
+        log_visits = math.log(self.visits)
+        return max(self.children, key = lambda child: sign * child.value / (child.visits * WIN_SCORE)
+                   + EXPLORATION * math.sqrt(log_visits / child.visits))
+
+def uct_search(board, team, depth, trials, budget=None, movetime_ms=MOVETIME_MS, stop=None, progress=None):
+    """
+    given a board state, team, rollout depth, and number of trials, grows a UCT monte carlo search tree and returns a tuple representation of the most visited move. The search runs budget rollouts, by default trials rollouts per possible move, the same number monte_carlo would run, but spent on the most promising lines. Given movetime_ms instead, the search keeps running rollouts until that many milliseconds have passed, and setting the stop event (a threading.Event) ends it early, either way returning the best move found so far. Like in monte_carlo, a progress function is called with the rollouts done, the total rollouts (None for a timed search) and the best move so far, here after every rollout
+    """
+    move_list = board.get_all_moves(team)
+    if len(move_list) < 2:
+        return move_list[0] if move_list else None
+    if budget == None and movetime_ms == None:
+        budget = trials * len(move_list)
+
+    def report(root, rollouts):
+        progress(rollouts, budget, best_move(root, move_list))
+
+    root = grow_tree(board, team, depth, budget, get_deadline(movetime_ms), stop, report if progress != None else None)
+    return best_move(root, move_list)
+
+def parallel_uct_search(board, team, depth, trials, budget=None, workers=WORKERS, movetime_ms=MOVETIME_MS):
+    """
+    given a board state, team, rollout depth, and number of trials, grows one independent UCT search tree per worker process, each with budget rollouts (or for movetime_ms milliseconds), then merges the visit counts and gamescore totals of their root moves and returns a tuple representation of the most visited move. Only the root statistics travel between processes, so this scales to many cores
+    """
+    move_list = board.get_all_moves(team)
+    if len(move_list) < 2:
+        return move_list[0] if move_list else None
+    if budget == None and movetime_ms == None:
+        budget = trials * len(move_list)
+
+    if workers > 1:
+        futures = [get_pool(workers).submit(root_stats, board.clone(), team, depth, budget, movetime_ms) for dummy_num in range(workers)]
+        results = [future.result() for future in futures]
+    else:
+        results = [root_stats(board, team, depth, budget, movetime_ms)]
+
+    # merge the root statistics of every tree
+    merged = {move: [0, 0] for move in move_list}
+    for stats in results:
+        for move in stats:
+            merged[move][0] += stats[move][0]
+            merged[move][1] += stats[move][1]
+    return max(merged, key = lambda k: merged[k][0])
+
+def root_stats(board, team, depth, budget, movetime_ms=None):
+    """
+    grow a UCT search tree with budget rollouts, or for movetime_ms milliseconds, and return a dictionary of root move -> (visits, gamescore total), this is the work done by each process of parallel_uct_search
+    """
+    root = grow_tree(board, team, depth, budget, get_deadline(movetime_ms))
+    return {child.move: (child.visits, child.value) for child in root.children}
+
+def get_deadline(movetime_ms):
+    """
+    Return the time.perf_counter() value movetime_ms milliseconds from now, or None if there is no time limit
+    """
+    if movetime_ms == None:
+        return None
+    return time.perf_counter() + movetime_ms / 1000
+
+def best_move(root, move_list):
+    """
+    Return the most visited move of a search tree root, this can be called at any point of the search. Falls back to the first of move_list if no rollout has finished yet
+    """
+    if not root.children:
+        return move_list[0]
+    return max(root.children, key = lambda child: child.visits).move
+
+def grow_tree(board, team, depth, budget, deadline=None, stop=None, progress=None):
+    """
+    given a board state, team, rollout depth, and number of rollouts, grow a UCT search tree from the board and return its root TreeNode. The search ends after budget rollouts, once time.perf_counter() passes the deadline, or once the stop event is set, whichever comes first, and always runs at least one rollout. The progress function, if given, is called with the root and the rollout count after every rollout. The board is left as it was found
+    """
+    root = TreeNode(None, team)
+    rollouts = 0
+
+    while True:
+        node = root
+        plies = 0
+
+        # selection, walk down through fully expanded nodes, applying their moves to the board
+        while True:
+            if node.untried == None:
+                node.untried = board.get_all_moves(node.team)
+            if node.untried or not node.children:
+                break
+            node = node.select_child()
+            board.apply_move(node.move[0], node.move[1])
+            plies += 1
+
+        # expansion and rollout, a node with no moves at all is a finished game and is scored by its result
+        if node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            board.apply_move(move[0], move[1])
+            plies += 1
+            child = TreeNode(move, chessgame.other_team(node.team), node)
+            node.children.append(child)
+            node = child
+            score = run_trial(board, node.team, depth)
+        else:
+            score = win_score(board.check_win())
+
+        # backpropagation
+        while node != None:
+            node.visits += 1
+            node.value += score
+            node = node.parent
+
+        for dummy_num in range(plies):
+            board.unmake_move()
+
+        rollouts += 1
+        if progress != None:
+            progress(root, rollouts)
+        if budget != None and rollouts >= budget:
+            break
+        if deadline != None and time.perf_counter() >= deadline:
+            break
+        if stop != None and stop.is_set():
+            break
+
+    return root
 
 def play_game(depth, trials):
     """
@@ -96,11 +520,11 @@ def play_game(depth, trials):
     else:
         print ("Error: unknown winner")
 
-# play_game(DEPTH, TRIALS)
-chess_gui.run_gui(ai_function=monte_carlo, depth=DEPTH, trials=TRIALS)
-
-
-
-
-
+if __name__ == "__main__":
+    # only start a game when run as a script, so worker processes (and other modules) can import this one
+    import chessGui as chess_gui
+    import openingBook
 
+    # play_game(DEPTH, TRIALS)
+    # the AI plays the opening from the book built by openingBook.py, load_book returns None when there is no book file, and the AI then always searches
+    chess_gui.run_gui(ai_function=monte_carlo, depth=DEPTH, trials=TRIALS, book=openingBook.load_book())
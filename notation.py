@@ -0,0 +1,69 @@
+"""
+Chess notation helpers shared by the UCI front end, the tournament runner and the opening book: square names, moves in UCI long algebraic notation and FEN positions. Malformed text raises ValueError
+"""
+
+import chessClass as chessgame
+
+FILES = "abcdefgh"
+RANKS = "12345678"
+FEN_RANKS = {"p": chessgame.PAWN, "r": chessgame.ROOK, "n": chessgame.KNIGHT, "b": chessgame.BISHOP, "q": chessgame.QUEEN, "k": chessgame.KING}
+# piece letters a UCI move can end with, a promotion
+PROMOTIONS = "qrbn"
+
+
+def tile_to_uci(tile):
+    """
+    Given a (row, col) tile, return its square name, row 7 is rank 1 and col 0 is file a, so (6, 4) is e2
+    """
+    return FILES[tile[1]] + str(8 - tile[0])
+
+def uci_to_tile(name):
+    """
+    Given a square name like e2, return its (row, col) tile, raises ValueError if the name is not a square
+    """
+    if len(name) != 2 or name[0] not in FILES or name[1] not in RANKS:
+        raise ValueError(f"invalid square {name!r}")
+    return (8 - int(name[1]), FILES.index(name[0]))
+
+def move_to_uci(move):
+    """
+    Given a move as a tuple of (org_tile, end_tile), return it in UCI long algebraic notation like e2e4
+    """
+    return tile_to_uci(move[0]) + tile_to_uci(move[1])
+
+def uci_to_move(text):
+    """
+    Given a move in UCI long algebraic notation, return it as a tuple of (org_tile, end_tile), raises ValueError if the text is not a move. A promotion piece letter is ignored, the engine has no promotion
+    """
+    if len(text) not in (4, 5) or (len(text) == 5 and text[4] not in PROMOTIONS):
+        raise ValueError(f"invalid move {text!r}")
+    return (uci_to_tile(text[0:2]), uci_to_tile(text[2:4]))
+
+def board_from_fen(fen):
+    """
+    Given a FEN string, return a tuple of a ChessBoard with its piece placement and the team to move, raises ValueError if the piece placement is malformed. Castling rights, en passant and the move clocks are ignored, the engine has none of them, and a pawn counts as moved when it is off its starting row
+    """
+    fields = fen.split()
+    rows = fields[0].split("/") if fields else []
+    if len(rows) != 8:
+        raise ValueError(f"invalid FEN {fen!r}, expected 8 ranks")
+    grid = [[chessgame.EMPTY for dummy_col in range(8)] for dummy_row in range(8)]
+    for row, rank_text in enumerate(rows):
+        col = 0
+        for char in rank_text:
+            if char in "12345678":
+                col += int(char)
+                continue
+            if char.lower() not in FEN_RANKS or col > 7:
+                raise ValueError(f"invalid FEN {fen!r}, bad rank {rank_text!r}")
+            team = chessgame.WHITE if char.isupper() else chessgame.BLACK
+            rank = FEN_RANKS[char.lower()]
+            if rank == chessgame.PAWN:
+                grid[row][col] = chessgame.Pawn(team, row != chessgame.PAWN_START_ROW[team])
+            else:
+                grid[row][col] = chessgame.PIECE_CLASSES[rank](team)
+            col += 1
+        if col != 8:
+            raise ValueError(f"invalid FEN {fen!r}, bad rank {rank_text!r}")
+    team = chessgame.BLACK if len(fields) > 1 and fields[1] == "b" else chessgame.WHITE
+    return chessgame.ChessBoard(grid, []), team
@@ -0,0 +1,150 @@
+"""
+Opening book, built from recorded self-play games (the JSONL files written by tournament.py) into a compact binary file of move statistics sorted by position key. The book is read through mmap with a binary search, so looking up a position costs microseconds and no parsing at load time. Run python openingBook.py --help to build one
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import chessClass as chessgame
+import notation
+
+# book file openingBook.py writes and load_book reads by default, next to this module so it is found from any working directory
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openingBook.bin")
+MAGIC = b"MCBOOK1\n"
+# one record per (position, move): position key, org square, end square, number of games, total result for the team that moved (1 for a win, 0.5 for a draw or unfinished game, 0 for a loss)
+RECORD = struct.Struct("<QBBIf")
+# positions past this many plies from the start are not added to the book
+MAX_PLIES = 16
+# fewest games a move needs before the book plays it
+MIN_COUNT = 2
+
+
+def position_key(board, team):
+    """
+    Given a board and the team to move, return the 64 bit book key of the position, the zobrist hash of the board with the team to move folded in
+    """
+    if team == chessgame.BLACK:
+        return board.get_hash() ^ chessgame.ZOBRIST_BLACK_TO_MOVE
+    return board.get_hash()
+
+def game_results(record):
+    """
+    Given a game record, return a dictionary of team -> the result of the game for that team, 1 for a win, 0 for a loss and 0.5 otherwise
+    """
+    if record["result"] == "white":
+        return {chessgame.WHITE: 1.0, chessgame.BLACK: 0.0}
+    elif record["result"] == "black":
+        return {chessgame.WHITE: 0.0, chessgame.BLACK: 1.0}
+    return {chessgame.WHITE: 0.5, chessgame.BLACK: 0.5}
+
+def build_book(game_files, output, max_plies=MAX_PLIES, min_count=1):
+    """
+    Given a list of JSONL game record files, replay the first max_plies moves of every game, add up the games and results of every (position, move) pair, and write the pairs played in at least min_count games to the output book file. Returns the number of records written
+    """
+    stats = {}
+    for path in game_files:
+        with open(path) as game_file:
+            for line in game_file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                results = game_results(record)
+                board = chessgame.MailboxBoard()
+                team = chessgame.WHITE
+                for text in record["moves"][:max_plies]:
+                    move = notation.uci_to_move(text)
+                    entry = stats.setdefault((position_key(board, team), move[0][0] * 8 + move[0][1], move[1][0] * 8 + move[1][1]), [0, 0.0])
+                    entry[0] += 1
+                    entry[1] += results[team]
+                    board.apply_move(move[0], move[1])
+                    team = chessgame.other_team(team)
+
+    records = sorted((key, org, end, count, total) for (key, org, end), (count, total) in stats.items() if count >= min_count)
+    with open(output, "wb") as book_file:
+        book_file.write(MAGIC)
+        for record in records:
+            book_file.write(RECORD.pack(*record))
+    return len(records)
+
+def load_book(path=BOOK_PATH):
+    """
+    Return an OpeningBook of the file at path, or None if there is no such file
+    """
+    if path == None or not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+class OpeningBook:
+    """
+    Read only view of a book file, memory mapped, so many processes can share one book without loading it
+    """
+    def __init__(self, path):
+        with open(path, "rb") as book_file:
+            if os.fstat(book_file.fileno()).st_size <= len(MAGIC):
+                self._data = b""
+            else:
+                self._data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data and self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an opening book file")
+        self._size = max(0, len(self._data) - len(MAGIC)) // RECORD.size
+
+    def __len__(self):
+        return self._size
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self._data, len(MAGIC) + index * RECORD.size)[0]
+
+    def lookup(self, board, team):
+        """
+        Given a board and the team to move, return a list of (move, games, total result) tuples of the book moves of the position, the list is empty if the position is not in the book
+        """
+        key = position_key(board, team)
+        # binary search for the first record of the key
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self._size:
+            record_key, org, end, count, total = RECORD.unpack_from(self._data, len(MAGIC) + low * RECORD.size)
+            if record_key != key:
+                break
+            entries.append(((chessgame.TILES[org], chessgame.TILES[end]), count, total))
+            low += 1
+        return entries
+
+    def choose(self, board, team, min_count=MIN_COUNT):
+        """
+        Given a board and the team to move, return the book move with the best average result over at least min_count games, or None if the book has no such move. A move that is not legal on the board, from a hash collision, is never returned
+        """
+        best = None
+        for move, count, total in self.lookup(board, team):
+            if count < min_count:
+                continue
+            piece = board.get_square(move[0][0], move[0][1])
+            if piece == chessgame.EMPTY or piece.get_team() != team or move[1] not in board.get_legal_moves(move[0]):
+                continue
+            if best == None or (total / count, count) > (best[1] / best[2], best[2]):
+                best = (move, total, count)
+        return best[0] if best != None else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from self-play game records")
+    parser.add_argument("games", nargs="+", help="JSONL game record files, as written by tournament.py")
+    parser.add_argument("--output", default=BOOK_PATH, help=f"book file to write (default: {BOOK_PATH})")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help=f"plies of each game added to the book (default: {MAX_PLIES})")
+    parser.add_argument("--min-count", type=int, default=1, help="fewest games a move needs to be written to the book (default: 1)")
+    args = parser.parse_args()
+
+    count = build_book(args.games, args.output, args.max_plies, args.min_count)
+    print(f"wrote {count} book moves to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Rollout policies for the Monte Carlo trials. A policy is a function policy(board, team, moves) that is given a board, the team to move and a non empty list of that team's (org_tile, end_tile) moves, and returns the move to play, it must leave the board unchanged. monte_carlo takes a policy function or the name of one in POLICIES
+"""
+
+import random
+import chessClass as chessgame
+
+# weight of a move that captures nothing, a capture adds VICTIM_FACTOR times the captured piece's value less the value of the capturing piece (MVV-LVA)
+QUIET_WEIGHT = 1
+VICTIM_FACTOR = 10
+# weight multiplier of a queen move to a square the other team attacks, unless it captures a piece worth at least a queen
+HANGING_QUEEN_FACTOR = 0.05
+# weight multiplier of a queen move out of attack to a safe square, when the queen is attacked where it stands
+QUEEN_ESCAPE_FACTOR = 30
+
+
+def random_policy(board, team, moves):
+    """
+    Pick one of the moves uniformly at random, the policy of the plain Monte Carlo trials
+    """
+    return random.choice(moves)
+
+def capture_policy(board, team, moves):
+    """
+    Pick one of the moves at random, with the weights of capture_weights
+    """
+    return random.choices(moves, capture_weights(board, team, moves))[0]
+
+def capture_weights(board, team, moves):
+    """
+    Return the list of weights capture_policy picks the moves with: captures are weighted by MVV-LVA (most valuable victim, least valuable attacker) so trials play the captures a real game would, and the queen is kept out of attack, queen moves to an attacked square are rarely picked, and when the queen is attacked where it stands its moves to safe squares are favoured
+    """
+    enemy = chessgame.other_team(team)
+    # whether the queen on each square is attacked, found the first time a move from that square is weighted
+    queen_attacked = {}
+    weights = []
+    for org, end in moves:
+        piece = board.get_square(org[0], org[1])
+        victim = board.get_square(end[0], end[1])
+        weight = QUIET_WEIGHT
+        victim_value = 0
+        if victim != chessgame.EMPTY:
+            victim_value = abs(victim.get_value())
+            weight += max(0, VICTIM_FACTOR * victim_value - abs(piece.get_value()))
+
+        if piece.get_rank() == chessgame.QUEEN and victim_value < abs(piece.get_value()):
+            if org not in queen_attacked:
+                queen_attacked[org] = board.is_attacked(org, enemy)
+            # test the end square with the move made, so the queen no longer stands on its old square and hides a piece attacking along the line it moves on
+            board.apply_move(org, end)
+            hanging = board.is_attacked(end, enemy)
+            board.unmake_move()
+            if hanging:
+                weight *= HANGING_QUEEN_FACTOR
+            elif queen_attacked[org]:
+                weight *= QUEEN_ESCAPE_FACTOR
+        weights.append(weight)
+    return weights
+
+POLICIES = {"random": random_policy, "capture": capture_policy}
+
+def get_policy(policy):
+    """
+    Given a policy function or the name of one in POLICIES, return the policy function
+    """
+    if callable(policy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError(f"unknown rollout policy {policy}, expected one of {sorted(POLICIES)}")
+    return POLICIES[policy]
@@ -0,0 +1,185 @@
+"""
+Opt-in instrumentation for the monte carlo search, counts board method calls, rollouts and rollout plies, and times each search phase. The board methods are only wrapped while a SearchStats object is recording, so a search run without one pays nothing. The wrappers are shared by every recording in the process and count into the recordings of the thread that makes the call, so searches on different threads can each be recorded at the same time
+"""
+
+import contextlib
+import json
+import threading
+import time
+import chessClass as chessgame
+
+# board classes whose methods are counted while recording
+BOARD_CLASSES = [chessgame.ChessBoard, chessgame.BitBoard, chessgame.MailboxBoard]
+# board methods counted while recording, the counter of each method has the method's name
+COUNTED_METHODS = ["clone", "apply_move", "unmake_move", "get_legal_moves", "get_all_moves", "get_pseudo_moves", "is_check", "check_win"]
+# guards installing and removing the counting wrappers
+_install_lock = threading.Lock()
+# number of recordings using the wrapper of each board method name, and of monteCarlo.run_trial under "run_trial"
+_users = {}
+# the (owner, name, original) methods replaced by the wrapper of each name, put back once no recording uses it
+_originals = {}
+# the SearchStats objects recording on each thread, as the list _local.recordings
+_local = threading.local()
+
+
+class SearchStats:
+    """
+    Statistics of one search, holding a count for each counted board method and search event, and the total seconds spent in each search phase. Pass one to monte_carlo to have it filled in, counts and times add up over every recording, call reset to start over. Only work done in this process is counted, the board method and rollout counts leave out simulations run in worker processes or by the batch engine, the trial counts of monte_carlo include them
+    """
+    def __init__(self, log_path=None, methods=COUNTED_METHODS):
+        # file each finished recording is appended to as one line of JSON, None to not log
+        self.log_path = log_path
+        # board methods whose calls are counted, an empty list only counts rollouts and search events, leaving the board methods unwrapped
+        self.methods = list(methods)
+        self.counts = {}
+        self.phases = {}
+        self.total = 0
+
+    def reset(self):
+        """
+        Set every count and time back to zero
+        """
+        self.counts = {}
+        self.phases = {}
+        self.total = 0
+
+    def count(self, name, number=1):
+        """
+        Add number to the count with the given name
+        """
+        self.counts[name] = self.counts.get(name, 0) + number
+
+    def add_time(self, name, seconds):
+        """
+        Add seconds to the time of the phase with the given name
+        """
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager timing the code inside it as the phase with the given name
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def recording(self):
+        """
+        Context manager counting the board method calls and rollouts made inside it by the current thread, adding its run time to the total, and logging the statistics as JSON when it ends if there is a log_path. A recording of this object started inside another one on the same thread only adds to the counts of the outer one, recordings on other threads count their own work
+        """
+        recordings = _thread_recordings()
+        if self in recordings:
+            yield self
+            return
+        names = self.methods + ["run_trial"]
+        _install(names)
+        recordings.append(self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total += time.perf_counter() - start
+            recordings.remove(self)
+            _uninstall(names)
+            if self.log_path != None:
+                with open(self.log_path, "a") as log_file:
+                    log_file.write(self.to_json() + "\n")
+
+    def as_dict(self):
+        """
+        Return the statistics as a dictionary of plain values, ready for json
+        """
+        return {"total": self.total, "counts": dict(self.counts), "phases": dict(self.phases)}
+
+    def to_json(self):
+        """
+        Return the statistics as a string of JSON
+        """
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+    def __str__(self):
+        lines = [f"total: {self.total:.3f}s"]
+        for name in sorted(self.phases):
+            lines.append(f"  {name}: {self.phases[name]:.3f}s")
+        for name in sorted(self.counts):
+            lines.append(f"  {name}: {self.counts[name]}")
+        return "\n".join(lines)
+
+def _thread_recordings():
+    """
+    Return the list of the SearchStats objects recording on the current thread
+    """
+    if not hasattr(_local, "recordings"):
+        _local.recordings = []
+    return _local.recordings
+
+def _install(names):
+    """
+    Replace the board methods with the given names, and monteCarlo.run_trial for the name "run_trial", with counting wrappers, unless an earlier recording already did
+    """
+    # imported here, monteCarlo imports this module
+    import monteCarlo
+
+    with _install_lock:
+        for name in names:
+            _users[name] = _users.get(name, 0) + 1
+            if _users[name] > 1:
+                continue
+            if name == "run_trial":
+                _originals[name] = [(monteCarlo, name, monteCarlo.run_trial)]
+                monteCarlo.run_trial = _counted_trial(monteCarlo.play_trial)
+                continue
+            _originals[name] = []
+            for board_class in BOARD_CLASSES:
+                original = board_class.__dict__.get(name)
+                if original != None:
+                    _originals[name].append((board_class, name, original))
+                    setattr(board_class, name, _counted(name, original))
+
+def _uninstall(names):
+    """
+    Put back the methods replaced by _install once no recording uses their wrappers any more
+    """
+    with _install_lock:
+        for name in names:
+            _users[name] -= 1
+            if _users[name] > 0:
+                continue
+            del _users[name]
+            for owner, attribute, original in reversed(_originals.pop(name)):
+                setattr(owner, attribute, original)
+
+def _counted(name, method):
+    """
+    Return a wrapper of a method that counts its calls under the given name into the recordings of the calling thread that count that method
+    """
+    def counted(*args, **kwargs):
+        for stats in _thread_recordings():
+            if name in stats.methods:
+                stats.count(name)
+        return method(*args, **kwargs)
+    return counted
+
+def _counted_trial(play_trial):
+    """
+    Return a replacement of monteCarlo.run_trial that counts rollouts and the plies they play into the recordings of the calling thread
+    """
+    def run_trial(*args, **kwargs):
+        score, plies = play_trial(*args, **kwargs)
+        for stats in _thread_recordings():
+            stats.count("rollouts")
+            stats.count("rollout_plies", plies)
+        return score
+    return run_trial
+
+def phase(stats, name):
+    """
+    Return stats.phase(name), or a context manager that does nothing when stats is None, so callers can time a phase without checking for stats themselves
+    """
+    if stats == None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
@@ -0,0 +1,38 @@
+import random
+import pytest
+import chessClass as chessgame
+
+np = pytest.importorskip("numpy")
+import batchRollout
+
+
+def random_positions(games, plies, seed):
+    # the positions of a few random games on a MailboxBoard, as (board array, team, legal moves, in check) tuples
+    rng = random.Random(seed)
+    positions = []
+    for dummy_num in range(games):
+        board = chessgame.MailboxBoard()
+        team = chessgame.WHITE
+        for dummy_ply in range(plies):
+            moves = board.get_all_moves(team)
+            positions.append((batchRollout.encode_board(board), team, sorted(moves), board.is_check(team)))
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board.apply_move(move[0], move[1])
+            team = chessgame.other_team(team)
+    return positions
+
+@pytest.mark.parametrize("team", [chessgame.WHITE, chessgame.BLACK])
+def test_batch_moves_and_check_match_mailbox_board(team):
+    positions = [position for position in random_positions(10, 80, 0) if position[1] == team]
+    boards = np.array([position[0] for position in positions])
+    sign = 1 if team == chessgame.WHITE else -1
+    tables = batchRollout.TABLES[team]
+
+    game, org, end = batchRollout.legal_moves(boards, sign, tables)
+    moves = [[] for dummy_num in positions]
+    for index in range(len(game)):
+        moves[game[index]].append((chessgame.TILES[org[index]], chessgame.TILES[end[index]]))
+    assert [sorted(game_moves) for game_moves in moves] == [position[2] for position in positions]
+    assert list(batchRollout.king_attacked(boards, sign, tables)) == [position[3] for position in positions]
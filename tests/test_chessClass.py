@@ -0,0 +1,101 @@
+import random
+import threading
+import pytest
+import benchmark
+import chessClass as chessgame
+import monteCarlo
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = chessgame.LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"
+    cache.put(3, "c")
+    assert cache.get(2) == None
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_lru_cache_counts_every_call_across_threads():
+    cache = chessgame.LRUCache(50)
+
+    def work(offset):
+        for key in range(2000):
+            cache.put((offset + key) % 100, key)
+            cache.get((offset + key * 7) % 100)
+
+    threads = [threading.Thread(target=work, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits + cache.misses == 8000
+    assert len(cache) == 50
+
+def test_transposition_table_is_an_lru_cache():
+    table = monteCarlo.TranspositionTable(2)
+    table.add("a", 2, 3.0)
+    table.add("a", 1, 1.0)
+    table.add("b", 1, 0.0)
+    table.add("c", 1, 0.0)
+    assert isinstance(table, chessgame.LRUCache)
+    assert table.get("a") == None
+    assert table.get("c") == [1, 0.0]
+
+def test_flyweight_pieces_are_immutable():
+    board = chessgame.MailboxBoard()
+    other = chessgame.MailboxBoard()
+    pawn = board.get_square(6, 4)
+    assert pawn is other.get_square(6, 4)
+    assert isinstance(pawn, chessgame.Pawn) and pawn.get_team() == chessgame.WHITE
+
+    for change in (pawn.moved, pawn.unmoved, lambda: setattr(pawn, "_is_moved", True), lambda: setattr(pawn, "_team", chessgame.BLACK),
+                   lambda: delattr(pawn, "_value")):
+        with pytest.raises(AttributeError):
+            change()
+    assert pawn._is_moved == False and pawn.get_team() == chessgame.WHITE and pawn.get_value() == 1
+    assert sorted(other.get_legal_moves((6, 4))) == [(4, 4), (5, 4)]
+
+def test_board_pieces_are_not_shared():
+    board = chessgame.ChessBoard()
+    board.apply_move((6, 4), (4, 4))
+    assert board.get_square(4, 4)._is_moved
+    assert not chessgame.ChessBoard().get_square(6, 4)._is_moved
+
+@pytest.fixture
+def uncached():
+    # the move and check_win caches are keyed by position hash, so they would hide a wrong move list or an unrestored board
+    benchmark.use_caches(False)
+    yield
+    benchmark.use_caches(True)
+
+@pytest.mark.parametrize("board_name", sorted(benchmark.BOARDS))
+@pytest.mark.parametrize("position", sorted(benchmark.POSITIONS))
+def test_perft_matches_expected_counts(board_name, position, uncached):
+    board, team = benchmark.setup_position(benchmark.BOARDS[board_name], position)
+    assert benchmark.perft(board, team, 3) == benchmark.EXPECTED[position][3]
+
+def snapshot(board, team):
+    return board.get_hash(), board.get_score(), sorted(board.get_all_moves(team)), [[board.get_square(row, col) for col in range(8)] for row in range(8)]
+
+@pytest.mark.parametrize("board_name", sorted(benchmark.BOARDS))
+@pytest.mark.parametrize("seed", range(3))
+def test_unmake_move_restores_every_position_of_a_random_game(board_name, seed, uncached):
+    rng = random.Random(seed)
+    board = benchmark.BOARDS[board_name]()
+    team = chessgame.WHITE
+    history = []
+    for dummy_num in range(80):
+        moves = board.get_all_moves(team)
+        if not moves:
+            break
+        history.append(snapshot(board, team))
+        move = rng.choice(moves)
+        board.apply_move(move[0], move[1])
+        team = chessgame.other_team(team)
+    assert len(history) > 10
+    while history:
+        board.unmake_move()
+        team = chessgame.other_team(team)
+        assert snapshot(board, team) == history.pop()
@@ -0,0 +1,59 @@
+import pytest
+import chessClass as chessgame
+import monteCarlo
+import searchStats
+
+
+@pytest.mark.parametrize("search", [monteCarlo.monte_carlo, monteCarlo.halving_search])
+def test_trials_start_with_the_other_team_to_move(search, monkeypatch):
+    # every trial runs on the position after a root move, so the team that did not make the move plays first
+    teams = []
+
+    def run_trial(board, team, depth, lazy=monteCarlo.LAZY, policy=monteCarlo.POLICY):
+        teams.append(team)
+        return 0
+
+    monkeypatch.setattr(monteCarlo, "run_trial", run_trial)
+    kwargs = {"workers": 1, "table": None, "book": None} if search == monteCarlo.monte_carlo else {}
+    for team in (chessgame.WHITE, chessgame.BLACK):
+        teams.clear()
+        search(chessgame.MailboxBoard(), team, 1, 1, **kwargs)
+        assert teams and set(teams) == {chessgame.other_team(team)}
+
+@pytest.mark.parametrize("budget", [1, 5, 20, 30, 41, 200])
+def test_halving_search_stays_within_its_budget(budget, monkeypatch):
+    calls = []
+
+    def run_trial(board, team, depth, lazy=monteCarlo.LAZY, policy=monteCarlo.POLICY):
+        calls.append(team)
+        return 0
+
+    monkeypatch.setattr(monteCarlo, "run_trial", run_trial)
+    board = chessgame.MailboxBoard()
+    move = monteCarlo.halving_search(board, chessgame.WHITE, 1, 1, budget=budget)
+    assert move in board.get_all_moves(chessgame.WHITE)
+    assert 0 < len(calls) <= budget
+
+def test_halving_search_default_budget_is_below_monte_carlo(monkeypatch):
+    calls = []
+
+    def run_trial(board, team, depth, lazy=monteCarlo.LAZY, policy=monteCarlo.POLICY):
+        calls.append(team)
+        return 0
+
+    monkeypatch.setattr(monteCarlo, "run_trial", run_trial)
+    monteCarlo.halving_search(chessgame.MailboxBoard(), chessgame.WHITE, 1, 8)
+    assert 20 <= len(calls) < 8 * 20
+
+def test_batch_trials_are_kept_apart_from_policy_trials():
+    pytest.importorskip("numpy")
+    table = monteCarlo.TranspositionTable()
+    board = chessgame.MailboxBoard()
+    stats = searchStats.SearchStats(methods=[])
+    # batch trials are uniformly random, so they fill the random entries and not the capture ones
+    monteCarlo.monte_carlo(board, chessgame.WHITE, 1, 2, workers=1, table=table, batch=True, policy="capture", book=None)
+    monteCarlo.monte_carlo(board, chessgame.WHITE, 1, 2, workers=1, table=table, policy="capture", book=None, stats=stats)
+    assert stats.counts["trials_reused"] == 0
+    stats.reset()
+    monteCarlo.monte_carlo(board, chessgame.WHITE, 1, 2, workers=1, table=table, policy="random", book=None, stats=stats)
+    assert stats.counts["trials_run"] == 0
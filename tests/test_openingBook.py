@@ -0,0 +1,26 @@
+import inspect
+import json
+import os
+import chessClass as chessgame
+import monteCarlo
+import notation
+import openingBook
+
+
+def test_book_path_is_next_to_the_module():
+    assert os.path.dirname(openingBook.BOOK_PATH) == os.path.dirname(os.path.abspath(openingBook.__file__))
+
+def test_monte_carlo_does_not_use_a_book_by_default():
+    assert inspect.signature(monteCarlo.monte_carlo).parameters["book"].default == None
+
+def test_book_plays_the_best_scoring_move(tmp_path):
+    games = tmp_path / "games.jsonl"
+    with open(games, "w") as game_file:
+        for moves, result in ((["e2e4", "e7e5"], "white"), (["e2e4", "d7d5"], "white"), (["d2d4", "d7d5"], "black"), (["d2d4"], "black")):
+            game_file.write(json.dumps({"moves": moves, "result": result}) + "\n")
+    path = tmp_path / "book.bin"
+
+    assert openingBook.build_book([str(games)], str(path)) == 5
+    book = openingBook.load_book(str(path))
+    assert book.choose(chessgame.ChessBoard(), chessgame.WHITE) == notation.uci_to_move("e2e4")
+    assert openingBook.load_book(str(tmp_path / "missing.bin")) == None
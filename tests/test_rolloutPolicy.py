@@ -0,0 +1,47 @@
+import pytest
+import chessClass as chessgame
+import rolloutPolicy
+
+
+def make_board(board_class, pieces):
+    """
+    Given a board class and a dictionary of (row, col) -> piece, return a board of that class with just those pieces
+    """
+    grid = [[chessgame.EMPTY for dummy_col in range(8)] for dummy_row in range(8)]
+    for (row, col), piece in pieces.items():
+        grid[row][col] = piece
+    board = chessgame.ChessBoard(grid, [])
+    return board if board_class == chessgame.ChessBoard else board_class(board)
+
+@pytest.mark.parametrize("board_class", [chessgame.ChessBoard, chessgame.BitBoard, chessgame.MailboxBoard])
+def test_queen_move_along_attacking_line_is_hanging(board_class):
+    # the black rook on a1 attacks the white queen on a3, and still attacks a5 once the queen has moved there
+    board = make_board(board_class, {(5, 0): chessgame.Queen(chessgame.WHITE), (7, 0): chessgame.Rook(chessgame.BLACK),
+                                     (6, 7): chessgame.King(chessgame.WHITE), (0, 7): chessgame.King(chessgame.BLACK)})
+    along = ((5, 0), (3, 0))
+    away = ((5, 0), (4, 1))
+    board_hash = board.get_hash()
+
+    weights = rolloutPolicy.capture_weights(board, chessgame.WHITE, [along, away])
+
+    assert weights[0] == rolloutPolicy.QUIET_WEIGHT * rolloutPolicy.HANGING_QUEEN_FACTOR
+    assert weights[1] == rolloutPolicy.QUIET_WEIGHT * rolloutPolicy.QUEEN_ESCAPE_FACTOR
+    assert board.get_hash() == board_hash
+
+def test_captures_weighted_by_victim_then_attacker():
+    board = make_board(chessgame.ChessBoard, {(4, 4): chessgame.Pawn(chessgame.WHITE, True), (4, 0): chessgame.Rook(chessgame.WHITE),
+                                              (3, 3): chessgame.Knight(chessgame.BLACK), (3, 0): chessgame.Pawn(chessgame.BLACK, True),
+                                              (7, 7): chessgame.King(chessgame.WHITE), (0, 7): chessgame.King(chessgame.BLACK)})
+    pawn_takes_knight = ((4, 4), (3, 3))
+    rook_takes_pawn = ((4, 0), (3, 0))
+    quiet = ((4, 0), (5, 0))
+
+    weights = rolloutPolicy.capture_weights(board, chessgame.WHITE, [pawn_takes_knight, rook_takes_pawn, quiet])
+
+    assert weights[0] > weights[1] > weights[2] == rolloutPolicy.QUIET_WEIGHT
+
+def test_get_policy():
+    assert rolloutPolicy.get_policy("capture") == rolloutPolicy.capture_policy
+    assert rolloutPolicy.get_policy(rolloutPolicy.random_policy) == rolloutPolicy.random_policy
+    with pytest.raises(ValueError):
+        rolloutPolicy.get_policy("unknown")
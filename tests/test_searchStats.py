@@ -0,0 +1,51 @@
+import threading
+import chessClass as chessgame
+import monteCarlo
+import searchStats
+
+
+def test_recording_counts_rollouts_and_restores_methods():
+    original = chessgame.MailboxBoard.apply_move
+    stats = searchStats.SearchStats()
+    monteCarlo.monte_carlo(chessgame.MailboxBoard(), chessgame.WHITE, 1, 2, workers=1, table=None, stats=stats)
+    assert stats.counts["rollouts"] == 2 * 20
+    assert stats.counts["trials_run"] == 2 * 20
+    assert chessgame.MailboxBoard.apply_move == original
+    assert monteCarlo.run_trial.__module__ == "monteCarlo"
+
+def test_concurrent_recordings_each_count_their_own_search():
+    original = chessgame.MailboxBoard.apply_move
+    stats = [searchStats.SearchStats() for dummy_num in range(2)]
+    errors = []
+    # both searches wait here until the other one is recording too
+    barrier = threading.Barrier(2)
+
+    def search(search_stats):
+        try:
+            with search_stats.recording():
+                barrier.wait()
+                monteCarlo.monte_carlo(chessgame.MailboxBoard(), chessgame.WHITE, 1, 3, workers=1, table=None, stats=search_stats)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=search, args=(search_stats,)) for search_stats in stats]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    for search_stats in stats:
+        assert search_stats.counts["rollouts"] == 3 * 20
+        assert search_stats.counts["trials_run"] == 3 * 20
+    assert chessgame.MailboxBoard.apply_move == original
+    assert monteCarlo.run_trial.__module__ == "monteCarlo"
+
+def test_work_of_other_threads_is_not_counted():
+    stats = searchStats.SearchStats()
+    with stats.recording():
+        thread = threading.Thread(target=monteCarlo.run_trial, args=(chessgame.MailboxBoard(), chessgame.WHITE, 1))
+        thread.start()
+        thread.join()
+        assert "rollouts" not in stats.counts
+        monteCarlo.run_trial(chessgame.MailboxBoard(), chessgame.WHITE, 1)
+    assert stats.counts["rollouts"] == 1
@@ -0,0 +1,25 @@
+import chessClass as chessgame
+import monteCarlo
+import tournament
+
+
+def test_nodes_leave_out_reused_trials():
+    settings = tournament.engine_settings({"depth": 1, "trials": 2})
+    table = monteCarlo.TranspositionTable()
+    board = chessgame.MailboxBoard()
+
+    assert tournament.choose_move(board, chessgame.WHITE, settings, table)[1] == 2 * 20
+    # every trial is now in the table, so the same search runs none
+    assert tournament.choose_move(board, chessgame.WHITE, settings, table)[1] == 0
+
+def test_nodes_count_rollouts_of_every_search():
+    board = chessgame.MailboxBoard()
+    settings = tournament.engine_settings({"search": "uct_search", "depth": 1, "trials": 1, "options": {"budget": 30}})
+    move, nodes = tournament.choose_move(board, chessgame.WHITE, settings, None)
+    assert move in board.get_all_moves(chessgame.WHITE)
+    assert nodes >= 30
+    for budget in (5, 20, 30, 60):
+        settings = tournament.engine_settings({"search": "halving_search", "depth": 1, "trials": 1, "options": {"budget": budget}})
+        move, nodes = tournament.choose_move(board, chessgame.WHITE, settings, None)
+        assert move in board.get_all_moves(chessgame.WHITE)
+        assert 0 < nodes <= budget
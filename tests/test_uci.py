@@ -0,0 +1,45 @@
+import io
+import pytest
+import chessClass as chessgame
+import monteCarlo
+import notation
+import uci
+
+
+def run_commands(*lines):
+    """
+    Given lines of UCI input, handle them with a fresh engine and return it with the lines it sent
+    """
+    output = io.StringIO()
+    engine = uci.UciEngine(output)
+    for line in lines:
+        engine.handle(line)
+    engine.stop_search()
+    return engine, output.getvalue().splitlines()
+
+def test_move_notation_round_trip():
+    assert notation.uci_to_move("e2e4") == ((6, 4), (4, 4))
+    assert notation.move_to_uci(((6, 4), (4, 4))) == "e2e4"
+    assert notation.uci_to_move("a7a8q") == ((1, 0), (0, 0))
+
+@pytest.mark.parametrize("text", ["", "e2", "e2e", "e2e9", "i2e4", "e2e4x", "e2e4qq"])
+def test_malformed_move_raises_value_error(text):
+    with pytest.raises(ValueError):
+        notation.uci_to_move(text)
+
+@pytest.mark.parametrize("fen", ["", "8/8/8 w", "rnbqkbnr/ppppXppp/8/8/8/8/PPPPPPPP/RNBQKBNR w", "9/8/8/8/8/8/8/8 w", "rnbqkbnrr/8/8/8/8/8/8/8 w"])
+def test_malformed_fen_raises_value_error(fen):
+    with pytest.raises(ValueError):
+        notation.board_from_fen(fen)
+
+def test_malformed_move_is_reported_and_keeps_earlier_moves():
+    engine, lines = run_commands("position startpos moves e2e4 e7", "isready")
+    assert any(line.startswith("info string") for line in lines)
+    assert lines[-1] == "readyok"
+    assert engine.team == chessgame.BLACK
+    assert engine.board.get_square(4, 4) != chessgame.EMPTY
+
+def test_malformed_fen_and_values_are_reported():
+    engine, lines = run_commands("position fen 8/8 w", "setoption name Depth value deep", "go movetime soon nodes 2", "isready")
+    assert sum(line.startswith("info string") for line in lines) == 3
+    assert engine.depth == monteCarlo.DEPTH
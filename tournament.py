@@ -0,0 +1,143 @@
+"""
+Self-play tournament runner, plays many AI vs AI games at once in a process pool, between two engine settings, and streams each finished game to a JSONL file. Run python tournament.py --help for the options
+"""
+
+import argparse
+import concurrent.futures
+import json
+import random
+import time
+import chessClass as chessgame
+import monteCarlo
+import notation
+import searchStats
+
+# search functions a side can use, parallel_uct_search is left out as each game already runs in its own worker process
+SEARCHES = {"monte_carlo": monteCarlo.monte_carlo, "uct_search": monteCarlo.uct_search, "halving_search": monteCarlo.halving_search}
+BOARDS = {"ChessBoard": chessgame.ChessBoard, "BitBoard": chessgame.BitBoard, "MailboxBoard": chessgame.MailboxBoard}
+# default engine settings, options are extra keyword arguments for the search function, like {"lazy": true} or {"movetime_ms": 500}
+DEFAULT_ENGINE = {"search": "monte_carlo", "depth": monteCarlo.DEPTH, "trials": monteCarlo.TRIALS, "options": {}}
+# number of moves (plies) after which an undecided game is stopped
+MAX_MOVES = 200
+
+
+def engine_settings(settings):
+    """
+    Given a dictionary of engine settings, return it completed with the DEFAULT_ENGINE value of every missing setting
+    """
+    complete = dict(DEFAULT_ENGINE)
+    complete.update(settings)
+    if complete["search"] not in SEARCHES:
+        raise ValueError(f"unknown search {complete['search']}, expected one of {sorted(SEARCHES)}")
+    return complete
+
+def choose_move(board, team, settings, table):
+    """
+    Given a board, the team to move, engine settings and that side's transposition table, run the engine's search and return a tuple of the move and the number of rollouts it actually ran, trials reused from the transposition table are not counted, so the node counts of every search compare
+    """
+    # only rollouts are counted, the board methods are left unwrapped so the search runs at full speed
+    stats = searchStats.SearchStats(methods=[])
+    kwargs = dict(settings["options"])
+    if settings["search"] == "monte_carlo":
+        # the game is already running in a worker process, every game keeps its own table so games do not depend on each other, and the opening book is left out so the games explore openings
+        kwargs.setdefault("workers", 1)
+        kwargs.setdefault("table", table)
+        kwargs.setdefault("book", None)
+        kwargs.setdefault("stats", stats)
+    with stats.recording():
+        move = SEARCHES[settings["search"]](board, team, settings["depth"], settings["trials"], **kwargs)
+    # trials run by the batch engine or in worker processes skip the rollout count, monte_carlo's count of the trials it ran covers them
+    return move, max(stats.counts.get("rollouts", 0), stats.counts.get("trials_run", 0))
+
+def play_game(game_id, white, black, max_moves=MAX_MOVES, seed=None, board_name="ChessBoard"):
+    """
+    Play one game between the white and black engine settings, stopping after max_moves moves, and return its record as a dictionary: the settings of both sides, the moves in UCI notation, the seconds and nodes of every move, the result ("white", "black", "draw" or "unfinished") and the final material score
+    """
+    if seed != None:
+        random.seed(seed)
+    board = BOARDS[board_name]()
+    team = chessgame.WHITE
+    sides = {chessgame.WHITE: white, chessgame.BLACK: black}
+    tables = {chessgame.WHITE: monteCarlo.TranspositionTable(), chessgame.BLACK: monteCarlo.TranspositionTable()}
+    moves = []
+    times = []
+    nodes = []
+    winner = False
+
+    for dummy_num in range(max_moves):
+        start = time.perf_counter()
+        move, move_nodes = choose_move(board, team, sides[team], tables[team])
+        times.append(time.perf_counter() - start)
+        if move == None:
+            break
+        board.apply_move(move[0], move[1])
+        moves.append(notation.move_to_uci(move))
+        nodes.append(move_nodes)
+        winner = board.check_win()
+        if winner:
+            break
+        team = chessgame.other_team(team)
+
+    if winner == chessgame.WHITE:
+        result = "white"
+    elif winner == chessgame.BLACK:
+        result = "black"
+    elif winner == chessgame.DRAW:
+        result = "draw"
+    else:
+        result = "unfinished"
+    return {"game": game_id, "seed": seed, "board": board_name, "white": white, "black": black, "moves": moves,
+            "times": times, "nodes": nodes, "result": result, "score": board.get_score()}
+
+def run_tournament(engine_a, engine_b, games, output, workers=2, max_moves=MAX_MOVES, seed=0, alternate=True, board_name="ChessBoard"):
+    """
+    Play games games between engine settings a and b in a pool of workers processes, swapping colours every game if alternate is set, and append every game record to the output JSONL file as soon as the game finishes. Returns a dictionary of the number of wins of "a" and "b", and the "draw" and "unfinished" games
+    """
+    engine_a = engine_settings(engine_a)
+    engine_b = engine_settings(engine_b)
+    totals = {"a": 0, "b": 0, "draw": 0, "unfinished": 0}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool, open(output, "a") as out_file:
+        futures = {}
+        for game_id in range(games):
+            a_is_white = not alternate or game_id % 2 == 0
+            white, black = (engine_a, engine_b) if a_is_white else (engine_b, engine_a)
+            future = pool.submit(play_game, game_id, white, black, max_moves, seed + game_id, board_name)
+            futures[future] = a_is_white
+
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            a_is_white = futures[future]
+            record["a"] = "white" if a_is_white else "black"
+            out_file.write(json.dumps(record) + "\n")
+            out_file.flush()
+
+            if record["result"] in ("draw", "unfinished"):
+                totals[record["result"]] += 1
+            elif (record["result"] == "white") == a_is_white:
+                totals["a"] += 1
+            else:
+                totals["b"] += 1
+            print(f"game {record['game']}: {record['result']} in {len(record['moves'])} moves, a {totals['a']} b {totals['b']} draw {totals['draw']} unfinished {totals['unfinished']}")
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a self-play tournament between two engine settings")
+    parser.add_argument("--engine-a", default="{}", help='JSON settings of engine a, e.g. \'{"search": "uct_search", "depth": 2, "trials": 10, "options": {}}\'')
+    parser.add_argument("--engine-b", default="{}", help="JSON settings of engine b")
+    parser.add_argument("--games", type=int, default=10, help="number of games (default: 10)")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes playing games at once (default: 2)")
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVES, help=f"moves after which a game is stopped as unfinished (default: {MAX_MOVES})")
+    parser.add_argument("--output", default="tournament.jsonl", help="JSONL file the game records are appended to (default: tournament.jsonl)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the first game, game n uses seed + n (default: 0)")
+    parser.add_argument("--board", choices=sorted(BOARDS), default="ChessBoard", help="board class the games are played on (default: ChessBoard)")
+    parser.add_argument("--no-alternate", action="store_true", help="let engine a play white in every game")
+    args = parser.parse_args()
+
+    totals = run_tournament(json.loads(args.engine_a), json.loads(args.engine_b), args.games, args.output, args.workers,
+                            args.max_moves, args.seed, not args.no_alternate, args.board)
+    print(json.dumps(totals))
+
+
+if __name__ == "__main__":
+    main()
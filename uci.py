@@ -0,0 +1,212 @@
+"""
+Headless UCI (Universal Chess Interface) front end for the Monte Carlo AI, run python uci.py and drive it from any UCI tool over stdin / stdout. The UCT search runs on a worker thread, so stop and quit are answered while it is thinking, and the process stays alive between moves
+"""
+
+import sys
+import threading
+import time
+import chessClass as chessgame
+import monteCarlo
+import notation
+
+NAME = "MC-AI-Chess"
+AUTHOR = "ChrisFrankoPhD"
+# seconds between info lines while searching
+INFO_INTERVAL = 1
+# share of the remaining clock time spent on one move when the go command only gives wtime / btime
+MOVES_TO_GO = 30
+# rollout budget of go infinite, the search runs until stop long before reaching it
+INFINITE = sys.maxsize
+
+
+class UciEngine:
+    """
+    UCI engine state, the current position and the running search. Commands are given one line at a time to handle, and every reply goes through send
+    """
+    def __init__(self, output=sys.stdout):
+        self._output = output
+        self._lock = threading.Lock()
+        self.depth = monteCarlo.DEPTH
+        self.trials = monteCarlo.TRIALS
+        self.board = chessgame.ChessBoard()
+        self.team = chessgame.WHITE
+        self._stop = threading.Event()
+        self._thread = None
+
+    def send(self, line):
+        """
+        Write one line of output, the search thread and the command loop both send, so lines are written whole
+        """
+        with self._lock:
+            self._output.write(line + "\n")
+            self._output.flush()
+
+    def handle(self, line):
+        """
+        Handle one line of input, returns False once the engine should quit
+        """
+        words = line.split()
+        if not words:
+            return True
+        command = words[0]
+        if command == "uci":
+            self.send(f"id name {NAME}")
+            self.send(f"id author {AUTHOR}")
+            self.send(f"option name Depth type spin default {monteCarlo.DEPTH} min 1 max 50")
+            self.send(f"option name Trials type spin default {monteCarlo.TRIALS} min 1 max 100000")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(words)
+        elif command == "ucinewgame":
+            self.stop_search()
+            monteCarlo.TABLE.clear()
+            self.board = chessgame.ChessBoard()
+            self.team = chessgame.WHITE
+        elif command == "position":
+            self.stop_search()
+            self.set_position(words)
+        elif command == "go":
+            self.stop_search()
+            self.go(words)
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            self.stop_search()
+            return False
+        elif command == "d":
+            self.send(str(self.board))
+        else:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def set_option(self, words):
+        """
+        Handle setoption name <name> value <value>, for the Depth and Trials options
+        """
+        if "name" not in words or "value" not in words:
+            return
+        name = " ".join(words[words.index("name") + 1:words.index("value")]).lower()
+        value = " ".join(words[words.index("value") + 1:])
+        if name not in ("depth", "trials"):
+            self.send(f"info string unknown option {name}")
+        elif not value.isdigit() or int(value) < 1:
+            self.send(f"info string invalid value {value} for option {name}")
+        elif name == "depth":
+            self.depth = int(value)
+        else:
+            self.trials = int(value)
+
+    def set_position(self, words):
+        """
+        Handle position [startpos | fen <fen>] [moves <move> ...], an invalid FEN is reported and leaves the position unchanged, an invalid or illegal move is reported and ends the move list
+        """
+        moves = words.index("moves") if "moves" in words else len(words)
+        if len(words) > 1 and words[1] == "fen":
+            try:
+                self.board, self.team = notation.board_from_fen(" ".join(words[2:moves]))
+            except ValueError as error:
+                self.send(f"info string {error}")
+                return
+        else:
+            self.board = chessgame.ChessBoard()
+            self.team = chessgame.WHITE
+        for text in words[moves + 1:]:
+            try:
+                move = notation.uci_to_move(text)
+            except ValueError as error:
+                self.send(f"info string {error}")
+                break
+            piece = self.board.get_square(move[0][0], move[0][1])
+            if piece == chessgame.EMPTY or piece.get_team() != self.team or move[1] not in self.board.get_legal_moves(move[0]):
+                self.send(f"info string illegal move {text}")
+                break
+            self.board.apply_move(move[0], move[1])
+            self.team = chessgame.other_team(self.team)
+
+    def go(self, words):
+        """
+        Handle go [movetime <ms>] [nodes <rollouts>] [wtime <ms> btime <ms> winc <ms> binc <ms>] [infinite], starting the search thread. Nodes are rollouts of the UCT search, without any limit the search runs the Trials option's number of rollouts per possible move
+        """
+        params = {}
+        for index, word in enumerate(words[1:-1], 1):
+            if word in ("movetime", "nodes", "wtime", "btime", "winc", "binc"):
+                if words[index + 1].isdigit():
+                    params[word] = int(words[index + 1])
+                else:
+                    self.send(f"info string invalid value {words[index + 1]} for {word}")
+
+        movetime_ms = params.get("movetime")
+        budget = params.get("nodes")
+        clock = params.get("wtime" if self.team == chessgame.WHITE else "btime")
+        if movetime_ms == None and clock != None:
+            increment = params.get("winc" if self.team == chessgame.WHITE else "binc", 0)
+            movetime_ms = max(1, clock // MOVES_TO_GO + increment)
+        if "infinite" in words and budget == None:
+            budget = INFINITE
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.search, args=(self.board.clone(), self.team, budget, movetime_ms), daemon=True)
+        self._thread.start()
+
+    def stop_search(self):
+        """
+        Stop the running search, if any, and wait for it to send its bestmove
+        """
+        if self._thread != None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def search(self, board, team, budget, movetime_ms):
+        """
+        Run the UCT search on the board and send info lines while it runs, then send the bestmove, this runs on the search thread
+        """
+        start = time.perf_counter()
+        # time of the last info line, and the rollout count of the latest progress call
+        last = {"info": start, "rollouts": 0}
+
+        def progress(root, rollouts):
+            last["rollouts"] = rollouts
+            now = time.perf_counter()
+            if now - last["info"] >= INFO_INTERVAL:
+                last["info"] = now
+                self.send_info(root, rollouts, now - start)
+
+        move_list = board.get_all_moves(team)
+        if not move_list:
+            self.send("bestmove 0000")
+            return
+        if budget == None and movetime_ms == None:
+            budget = self.trials * len(move_list)
+
+        # grow the tree directly rather than through uct_search, the info lines need its root
+        root = monteCarlo.grow_tree(board, team, self.depth, budget, monteCarlo.get_deadline(movetime_ms), self._stop, progress)
+        self.send_info(root, last["rollouts"], time.perf_counter() - start)
+        self.send(f"bestmove {notation.move_to_uci(monteCarlo.best_move(root, move_list))}")
+
+    def send_info(self, root, rollouts, elapsed):
+        """
+        Send an info line for the search tree root, with the rollout count as nodes, and the average gamescore of the most visited move as the score, in centipawns from the point of view of the team to move
+        """
+        line = f"info depth {self.depth} nodes {rollouts} nps {int(rollouts / elapsed) if elapsed > 0 else 0} time {int(elapsed * 1000)}"
+        if root.children:
+            child = max(root.children, key = lambda child: child.visits)
+            sign = 1 if root.team == chessgame.WHITE else -1
+            line += f" score cp {int(100 * sign * child.value / child.visits)} pv {notation.move_to_uci(child.move)}"
+        self.send(line)
+
+def main():
+    """
+    Read UCI commands from stdin until quit or end of input
+    """
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop_search()
+
+
+if __name__ == "__main__":
+    main()